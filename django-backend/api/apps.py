@@ -1,6 +1,27 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate, pre_save, post_save
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .columnar import record_budget_save
+        from .lookups import ensure_lookups
+        from .memory_dates import ensure_memory_dates
+        from .rollup import ensure_rollup
+        from .search import ensure_search_index
+        from .sqlite_profile import apply_sqlite_profile
+        from .models import Budget
+        from .vocabulary import FIELDS, remember_old_values, record_save
+        connection_created.connect(apply_sqlite_profile)
+        post_migrate.connect(ensure_lookups, sender=self)  # Before the rollup and search index read the ids
+        post_migrate.connect(ensure_rollup, sender=self)
+        post_migrate.connect(ensure_memory_dates, sender=self)
+        post_migrate.connect(ensure_search_index, sender=self)
+        for model in {model for sources in FIELDS.values() for model in sources}:
+            pre_save.connect(remember_old_values, sender=model)
+            post_save.connect(record_save, sender=model)
+        post_save.connect(record_budget_save, sender=Budget)
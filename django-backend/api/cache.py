@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import F
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+from .models import DataVersion
+
+# Response cache for the report and lookup endpoints.
+# Entries are keyed by endpoint + normalized filters + the data version they were built from,
+# so bumping a version makes every dependent entry unreachable without scanning the cache.
+# Each bump is also counted in api_dataversion, which every server process and restart sees,
+# so the ETags built from it match whichever worker answers the revalidation.
+
+DEFAULTS = {
+    'BACKEND': 'local',  # 'local' (in-process LRU) or 'django' (CACHES framework)
+    'ALIAS': 'default',  # CACHES alias used by the 'django' backend
+    'MAX_ENTRIES': 256,  # LRU bound for the 'local' backend
+    'TIMEOUT': None,  # Entry timeout in seconds for the 'django' backend
+    'WATCH_EXTERNAL_WRITES': False,  # Also invalidate on commits made by other processes (multi-worker serving)
+}
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_versions = {}
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+_external = {'epoch': 0}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'REPORT_CACHE', {})}
+
+
+def _version_key(trip_id):
+    return "traveltrack:version:global" if trip_id is None else f"traveltrack:version:trip:{trip_id}"
+
+
+def get_data_version(trip_id=None):
+    """Return the current global version, or the version of one trip."""
+    config = _config()
+    key = _version_key(trip_id)
+    if config['BACKEND'] == 'django':
+        return caches[config['ALIAS']].get(key, 0)
+    with _lock:
+        return _versions.get(key, 0)
+
+
+def bump_data_version(trip_id=None):
+    """
+    Invalidate cached responses after a write.
+    Bumps the global version and, when given, the version of the written trip.
+    """
+    config = _config()
+    keys = [_version_key(None)]
+    if trip_id is not None:
+        keys.append(_version_key(int(trip_id)))
+    _bump_shared_versions(keys)
+
+    if config['BACKEND'] == 'django':
+        backend = caches[config['ALIAS']]
+        for key in keys:
+            backend.add(key, 0, timeout=None)
+            backend.incr(key)
+        return
+
+    with _lock:
+        for key in keys:
+            _versions[key] = _versions.get(key, 0) + 1
+
+
+def _bump_shared_versions(keys):
+    for key in keys:
+        DataVersion.objects.get_or_create(key=key)
+        DataVersion.objects.filter(key=key).update(version=F('version') + 1)
+
+
+def shared_data_version(trip_id=None):
+    """Return the global or per-trip version from the database, the same in every process."""
+    version = DataVersion.objects.filter(key=_version_key(trip_id)).values_list('version', flat=True).first()
+    return version or 0
+
+
+def external_epoch():
+    """
+    Counter of commits seen from other connections, when WATCH_EXTERNAL_WRITES is on (else 0).
+    SQLite's PRAGMA data_version changes on a connection whenever another connection commits,
+    including ones in other worker processes. Per-trip versions cannot tell what those writes
+    touched, so any change invalidates everything. A connection seen for the first time counts
+    as a change too, since writes made before it opened are unknown.
+    """
+    if not _config()['WATCH_EXTERNAL_WRITES'] or connection.vendor != 'sqlite':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA data_version")
+        seen = (id(connection.connection), cursor.fetchone()[0])
+    with _lock:
+        if getattr(connection, '_traveltrack_data_version', None) != seen:
+            connection._traveltrack_data_version = seen
+            _external['epoch'] += 1
+        return _external['epoch']
+
+
+def normalize_filters(request):
+    """
+    Return (trip_id, location, category, start_date, end_date) for the cache key.
+    Blank values become None and a half-open date range is dropped, as the views ignore it.
+    """
+    values = [(request.GET.get(key) or '').strip() or None
+              for key in ("trip_id", "location", "category", "start_date", "end_date")]
+    trip_id, location, category, start_date, end_date = values
+    if trip_id is not None:
+        try:
+            trip_id = int(trip_id)
+        except ValueError:
+            pass
+    if not (start_date and end_date):
+        start_date = end_date = None
+    return (trip_id, location, category, start_date, end_date)
+
+
+def _get(key):
+    config = _config()
+    if config['BACKEND'] == 'django':
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return caches[config['ALIAS']].get(f"traveltrack:response:{digest}")
+    with _lock:
+        if key not in _entries:
+            return None
+        _entries.move_to_end(key)
+        return _entries[key]
+
+
+def _set(key, value):
+    config = _config()
+    if config['BACKEND'] == 'django':
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        caches[config['ALIAS']].set(f"traveltrack:response:{digest}", value, timeout=config['TIMEOUT'])
+        return
+    with _lock:
+        _entries[key] = value
+        _entries.move_to_end(key)
+        while len(_entries) > config['MAX_ENTRIES']:
+            _entries.popitem(last=False)
+            _stats['evictions'] += 1
+
+
+def _lookup(endpoint, request, extra_params):
+    """Return (cache key, cached data or None) for a request, counting the hit or miss."""
+    filters = normalize_filters(request)
+    extra = tuple(request.GET.get(name) for name in extra_params)
+    trip_id = filters[0] if isinstance(filters[0], int) else None
+    key = (endpoint, filters, extra, get_data_version(trip_id), external_epoch())
+
+    data = _get(key)
+    with _lock:
+        _stats['hits' if data is not None else 'misses'] += 1
+    return key, data
+
+
+def cached_response(endpoint, extra_params=(), response_class=Response):
+    """
+    Cache the data of a GET view keyed by endpoint, normalized filters and data version.
+    extra_params lists further query parameters that change the response.
+    Place below @api_view so the view receives the DRF request. Async views are supported
+    too; they return a response carrying .data and cache hits are rebuilt with response_class.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                key, data = await sync_to_async(_lookup)(endpoint, request, extra_params)
+                if data is not None:
+                    return response_class(data)
+
+                response = await view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    await sync_to_async(_set)(key, response.data)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key, data = _lookup(endpoint, request, extra_params)
+            if data is not None:
+                return response_class(data)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                _set(key, response.data)
+            return response
+        return wrapper
+    return decorator
+
+
+def version_etag(request, *args, **kwargs):
+    """
+    ETag of a GET response derived from the shared data version alone (one primary key lookup),
+    so it is the same from every worker process and survives restarts.
+    Uses the trip's version for trip URLs and trip_id-filtered requests, else the global version.
+    """
+    trip_id = kwargs.get("trip_id")
+    if trip_id is None:
+        trip_id = normalize_filters(request)[0]
+    trip_id = trip_id if isinstance(trip_id, int) else None
+    stamp = (request.get_full_path(), shared_data_version(trip_id))
+    return hashlib.sha1(repr(stamp).encode()).hexdigest()
+
+
+def conditional_response(view):
+    """
+    Add a strong version ETag and answer a matching If-None-Match with 304 before the view runs.
+    Clients must revalidate every time (Cache-Control: no-cache). Place above @api_view, or
+    above @require_GET on async views, whose ETag is computed off the event loop as
+    external_epoch() and the 'django' backend may query.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            etag = await sync_to_async(version_etag)(request, *args, **kwargs)
+            conditional = condition(etag_func=lambda *args, **kwargs: etag)(view)
+            return await conditional(request, *args, **kwargs)
+        return cache_control(private=True, no_cache=True)(async_wrapper)
+
+    return cache_control(private=True, no_cache=True)(condition(etag_func=version_etag)(view))
+
+
+def cache_stats():
+    """Return hit/miss counters and the current size of the local cache."""
+    config = _config()
+    with _lock:
+        return {
+            'backend': config['BACKEND'],
+            'hits': _stats['hits'],
+            'misses': _stats['misses'],
+            'evictions': _stats['evictions'],
+            'entries': len(_entries),
+            'max_entries': config['MAX_ENTRIES'],
+        }
+
+
+def clear_cache():
+    """Drop every local entry and reset the counters."""
+    with _lock:
+        _entries.clear()
+        for name in _stats:
+            _stats[name] = 0
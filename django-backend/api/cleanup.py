@@ -0,0 +1,103 @@
+import os
+import time
+from django.conf import settings
+from .models import PersonPhoto, Memories, ImageRendition
+
+# Removal of media files that no row references any more.
+# The referenced names are loaded into a set once, then the media tree is walked with os.scandir
+# so each file costs one O(1) membership test regardless of how many rows or files there are.
+
+IGNORED_PREFIXES = (".",)  # .gitignore, .gitkeep and other dotfiles stay
+SAMPLE_SIZE = 20  # Unused names echoed back in the summary
+
+
+def referenced_media():
+    """Return the set of storage names referenced by photos, memories and renditions."""
+    names = set()
+    for queryset in (PersonPhoto.objects.values_list('photo', flat=True),
+                     Memories.objects.values_list('memory_photo', flat=True),
+                     ImageRendition.objects.values_list('image', flat=True)):
+        names.update(name for name in queryset.iterator(chunk_size=2000) if name)
+    return names
+
+
+def iter_media_files(root):
+    """Yield (storage name, DirEntry) for every file under root, depth first."""
+    stack = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith(IGNORED_PREFIXES):
+                    continue
+                name = f"{prefix}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, f"{name}/"))
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, entry
+
+
+def cleanup_media(dry_run=False, batch_size=500, min_age=300, progress=None):
+    """
+    Delete media files that are not referenced in the database.
+    Files modified in the last min_age seconds are skipped so in-flight uploads and renditions survive.
+    With dry_run=True nothing is removed. progress(summary), when given, is called after each batch.
+    Returns a bounded summary: counts, bytes reclaimed and a sample of unused names.
+    """
+    referenced = referenced_media()
+    cutoff = time.time() - min_age
+    summary = {
+        "dry_run": dry_run,
+        "scanned": 0,
+        "referenced": len(referenced),
+        "unused": 0,
+        "deleted": 0,
+        "failed": 0,
+        "skipped_recent": 0,
+        "bytes_reclaimed": 0,
+        "sample": [],
+    }
+
+    def flush(batch):
+        for name, path, size in batch:
+            try:
+                os.remove(path)
+                summary["deleted"] += 1
+                summary["bytes_reclaimed"] += size
+            except OSError as e:
+                summary["failed"] += 1
+                print(f"Failed to delete {name}: {e}")
+        if progress:
+            progress(summary)
+
+    batch = []
+    for name, entry in iter_media_files(str(settings.MEDIA_ROOT)):
+        summary["scanned"] += 1
+        if name in referenced:
+            continue
+
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > cutoff:
+            summary["skipped_recent"] += 1
+            continue
+
+        summary["unused"] += 1
+        if len(summary["sample"]) < SAMPLE_SIZE:
+            summary["sample"].append(name)
+        if dry_run:
+            summary["bytes_reclaimed"] += stat.st_size
+            continue
+
+        batch.append((name, entry.path, stat.st_size))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
+
+    return summary
@@ -0,0 +1,311 @@
+import datetime
+import sys
+import threading
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from .cache import external_epoch
+from .models import canonical_key
+
+try:
+    import numpy as np
+except ImportError:  # The engine is optional; the report views fall back to SQL without it
+    np = None
+
+# In-memory columnar copy of api_budget for the expense summary and pie aggregations.
+# Budget rows are held as NumPy columns: expense, date ordinal and dictionary-encoded trip,
+# location and category codes. A filter combination becomes a few vectorized comparisons and
+# the pies a bincount, instead of a new SQL scan.
+# The columns load lazily on the first query. Instance saves patch them in place after commit
+# through post_save; the delete views call record_budget_deletes(), since a post_delete receiver
+# would stop Django from deleting Budget querysets with a single DELETE. Other bulk writes call
+# invalidate_budget_engine().
+
+DEFAULTS = {
+    'ENABLED': True,  # Used only when NumPy is installed
+    'COMPACT_RATIO': 0.25,  # Rebuild when this share of the slots holds deleted rows
+}
+
+ORDINAL_OFFSET = 1721424.5  # julianday(date) - ORDINAL_OFFSET == date.toordinal()
+LATENCY_SAMPLES = 256
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'BUDGET_ENGINE', {})}
+
+
+def engine_available():
+    return np is not None and _config()['ENABLED']
+
+
+class _Dictionary:
+    """Value <-> integer code mapping of one dictionary-encoded column; codes are looked up by key(value)."""
+
+    def __init__(self, key=None):
+        self.key = key or (lambda value: value)
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        key = self.key(value)
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value):
+        return self.codes.get(self.key(value))
+
+
+class _Columns:
+    """Growable column buffers; slots of deleted rows stay in place with alive=False."""
+
+    def __init__(self, capacity):
+        capacity = max(capacity, 1024)
+        self.size = 0
+        self.expense = np.zeros(capacity, dtype=np.float64)
+        self.date = np.zeros(capacity, dtype=np.int32)
+        self.trip = np.zeros(capacity, dtype=np.int32)
+        self.location = np.zeros(capacity, dtype=np.int32)
+        self.category = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.slots = {}  # budget_id -> slot
+        self.trips = _Dictionary()
+        self.locations = _Dictionary(canonical_key)  # Matched like the lookup tables match names
+        self.categories = _Dictionary(canonical_key)
+        self.dead = 0
+
+    def arrays(self):
+        return ("expense", "date", "trip", "location", "category", "alive")
+
+    def _grow(self):
+        for name in self.arrays():
+            column = getattr(self, name)
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def put(self, budget_id, trip_id, location, category, ordinal, expense):
+        slot = self.slots.get(budget_id)
+        if slot is None:
+            if self.size == len(self.expense):
+                self._grow()
+            slot = self.slots[budget_id] = self.size
+            self.size += 1
+        self.expense[slot] = expense
+        self.date[slot] = ordinal
+        self.trip[slot] = self.trips.encode(trip_id)
+        self.location[slot] = self.locations.encode(location)
+        self.category[slot] = self.categories.encode(category)
+        self.alive[slot] = True
+
+    def remove(self, budget_id):
+        slot = self.slots.pop(budget_id, None)
+        if slot is not None:
+            self.alive[slot] = False
+            self.dead += 1
+
+    def nbytes(self):
+        arrays = sum(getattr(self, name).nbytes for name in self.arrays())
+        strings = sum(sys.getsizeof(value) for dictionary in (self.locations, self.categories)
+                      for value in dictionary.values)
+        return arrays + strings + sys.getsizeof(self.slots) + 16 * len(self.slots)
+
+
+class BudgetEngine:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._columns = None
+        self._generation = 0  # Bumped by every change, so a load that raced a write is not kept
+        self._epoch = 0
+        self._stats = {'rebuilds': 0, 'rebuild_seconds': None, 'queries': 0}
+        self._latencies = []
+
+    def _load(self):
+        query = f"""
+            SELECT b.budget_id, b.trip_id, l.name, c.name,
+                   CAST(julianday(b.date) - {ORDINAL_OFFSET} AS INTEGER), b.expense
+            FROM api_budget b
+            JOIN api_location l ON l.location_id = b.location_id
+            JOIN api_category c ON c.category_id = b.category_id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM api_budget")
+            columns = _Columns(cursor.fetchone()[0] * 2)
+            cursor.execute(query)
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                for budget_id, trip_id, location, category, ordinal, expense in rows:
+                    columns.put(budget_id, trip_id, location, category, ordinal or 0, float(expense or 0))
+        return columns
+
+    def _current(self):
+        epoch = external_epoch()
+        with self._lock:
+            columns = self._columns
+            if columns is not None and self._epoch == epoch and \
+                    columns.dead <= _config()['COMPACT_RATIO'] * max(columns.size, 1):
+                return columns
+            generation = self._generation
+
+        start = time.perf_counter()
+        columns = self._load()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats['rebuilds'] += 1
+            self._stats['rebuild_seconds'] = elapsed
+            if self._generation == generation:
+                self._columns = columns
+                self._epoch = epoch
+        return columns
+
+    def _mask(self, columns, trip_id, location, category, start_date, end_date):
+        """Boolean mask of the filtered rows, or None when a filter matches nothing."""
+        size = columns.size
+        mask = columns.alive[:size].copy()
+        for dictionary, column, value in ((columns.trips, columns.trip, trip_id),
+                                          (columns.locations, columns.location, location),
+                                          (columns.categories, columns.category, category)):
+            if value is None:
+                continue
+            code = dictionary.code(value)
+            if code is None:
+                return None
+            mask &= column[:size] == code
+        if start_date is not None and end_date is not None:
+            mask &= (columns.date[:size] >= start_date) & (columns.date[:size] <= end_date)
+        return mask
+
+    def _timed(self, compute):
+        columns = self._current()
+        start = time.perf_counter()
+        with self._lock:
+            result = compute(columns)
+            self._stats['queries'] += 1
+            self._latencies.append(time.perf_counter() - start)
+            del self._latencies[:-LATENCY_SAMPLES]
+        return result
+
+    def summary(self, filters):
+        """Expense summary for normalized filters, shaped like the SQL summary."""
+        def compute(columns):
+            mask = self._mask(columns, *filters)
+            expenses = columns.expense[:columns.size][mask] if mask is not None else np.empty(0)
+            if not len(expenses):
+                return {"total_expense": 0, "average_expense": 0, "number_of_expenses": 0,
+                        "max_expense": 0, "min_expense": 0, "last_date": None}
+            last = int(columns.date[:columns.size][mask].max())
+            total = float(expenses.sum())
+            return {
+                "total_expense": total,
+                "average_expense": total / len(expenses),
+                "number_of_expenses": int(len(expenses)),
+                "max_expense": float(expenses.max()),
+                "min_expense": float(expenses.min()),
+                "last_date": datetime.date.fromordinal(last).isoformat() if last > 0 else None,
+            }
+        return self._timed(compute)
+
+    def breakdown(self, column, filters):
+        """Expense totals grouped by "category" or "location", largest first."""
+        def compute(columns):
+            mask = self._mask(columns, *filters)
+            if mask is None:
+                return []
+            dictionary = columns.categories if column == "category" else columns.locations
+            codes = (columns.category if column == "category" else columns.location)[:columns.size][mask]
+            totals = np.bincount(codes, weights=columns.expense[:columns.size][mask],
+                                 minlength=len(dictionary.values))
+            present = np.flatnonzero(np.bincount(codes, minlength=len(dictionary.values)))
+            order = present[np.argsort(-totals[present], kind="stable")]
+            return [{column: dictionary.values[code], "total": float(totals[code])} for code in order]
+        return self._timed(compute)
+
+    def apply(self, removed=(), saved=()):
+        """Drop the removed budget ids and upsert the saved rows; a no-op until loaded."""
+        with self._lock:
+            self._generation += 1
+            if self._columns is None:
+                return
+            for budget_id in removed:
+                self._columns.remove(budget_id)
+            for row in saved:
+                self._columns.put(*row)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._columns = None
+
+    def stats(self):
+        with self._lock:
+            columns = self._columns
+            latencies = sorted(self._latencies)
+            return {
+                'available': np is not None,
+                'enabled': engine_available(),
+                'loaded': columns is not None,
+                'rows': len(columns.slots) if columns else 0,
+                'deleted_slots': columns.dead if columns else 0,
+                'memory_bytes': columns.nbytes() if columns else 0,
+                'rebuilds': self._stats['rebuilds'],
+                'rebuild_seconds': self._stats['rebuild_seconds'],
+                'queries': self._stats['queries'],
+                'median_query_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+                'max_query_ms': latencies[-1] * 1000 if latencies else None,
+            }
+
+
+budget_engine = BudgetEngine()
+
+
+def engine_filters(trip_id, location, category, start_date, end_date):
+    """
+    Convert report filters to engine filters (trip id, location, category, start and end ordinals).
+    Returns None when the engine is off or cannot answer them the way SQL would, e.g. a non-numeric trip id.
+    """
+    if not engine_available():
+        return None
+    try:
+        trip_id = int(trip_id) if trip_id else None
+        if start_date and end_date:
+            start_date = datetime.date.fromisoformat(start_date).toordinal()
+            end_date = datetime.date.fromisoformat(end_date).toordinal()
+        else:
+            start_date = end_date = None
+    except ValueError:
+        return None
+    return (trip_id, location or None, category or None, start_date, end_date)
+
+
+def invalidate_budget_engine():
+    """Drop the columns after bulk writes that bypass model signals (bulk_create, queryset.update)."""
+    transaction.on_commit(budget_engine.invalidate)
+
+
+def _row(instance):
+    date = instance.date
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date)
+    return (instance.budget_id, instance.trip_id, instance.location.name, instance.category.name,
+            date.toordinal(), float(instance.expense))
+
+
+def record_budget_save(sender, instance, **kwargs):
+    """post_save: upsert the row once the write commits."""
+    try:
+        row = _row(instance)
+    except (TypeError, ValueError):
+        transaction.on_commit(budget_engine.invalidate)
+        return
+    transaction.on_commit(lambda: budget_engine.apply(saved=[row]))
+
+
+def record_budget_deletes(budget_ids):
+    """Drop the deleted budget ids from the columns once the delete commits."""
+    budget_ids = list(budget_ids)
+    transaction.on_commit(lambda: budget_engine.apply(removed=budget_ids))
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+# Bounded thread pool for the async report views.
+# Independent aggregate queries are sent to the pool together, each worker thread using its own
+# (persistent) database connection, so a report takes as long as its slowest query.
+# SQLite in WAL mode serves these reads concurrently; callers inside a transaction or on an
+# in-memory database run their queries one after another instead, as other connections could
+# not see their data.
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_WORKERS': 4,  # Queries running at once across all requests of this process
+}
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'REPORT_CONCURRENCY', {})}
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_config()['MAX_WORKERS'],
+                                           thread_name_prefix="report-query")
+        return _executor
+
+
+def _run_serially():
+    """True when the calling thread's queries must stay on its own connection."""
+    return (not _config()['ENABLED'] or connection.in_atomic_block
+            or connection.vendor == 'sqlite' and connection.is_in_memory_db())
+
+
+def _run(call):
+    # Pool threads never see request_started/finished, so recycle broken or expired connections here
+    close_old_connections()
+    return call()
+
+
+def _run_all(calls):
+    return [call() for call in calls]
+
+
+async def gather_queries(*calls):
+    """Run independent sync query callables concurrently; returns their results in order."""
+    if await sync_to_async(_run_serially)():
+        return await sync_to_async(_run_all)(calls)
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    return await asyncio.gather(*(loop.run_in_executor(executor, _run, call) for call in calls))
@@ -0,0 +1,45 @@
+from PIL import Image, ImageOps
+
+# Image decoding and re-encoding for upload ingestion.
+# Everything here works on file paths only and never touches Django, so it runs in worker
+# processes: a hostile or huge image can only exhaust or crash a worker, not the server.
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def normalize_image(source_path, destination_path, image_format, quality, max_pixels, max_edge=None):
+    """
+    Verify, decode and re-encode one uploaded image.
+    The pixel count is checked from the header before anything is decoded. The image is rotated
+    upright from its EXIF orientation, downscaled to max_edge when given, and saved without
+    metadata. Returns (width, height, original width, original height), sizes taken after
+    the rotation; raises InvalidImage otherwise.
+    """
+    Image.MAX_IMAGE_PIXELS = max_pixels  # Pillow refuses anything past twice this as a bomb
+    try:
+        with Image.open(source_path) as image:
+            if image.width * image.height > max_pixels:
+                raise InvalidImage(f"Image is larger than {max_pixels // 1_000_000} megapixels.")
+            image.verify()  # Structural check; the file must be reopened to decode
+
+        with Image.open(source_path) as image:
+            image = ImageOps.exif_transpose(image)
+            original_size = image.size
+            if max_edge and max(image.size) > max_edge:
+                image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+            if image_format == "JPEG" and image.mode == "RGBA":
+                image = image.convert("RGB")
+            # Only the colour profile is carried over: no EXIF, GPS, camera or other metadata
+            image.save(destination_path, format=image_format, quality=quality,
+                       icc_profile=image.info.get("icc_profile"))
+            return image.width, image.height, *original_size
+    except InvalidImage:
+        raise
+    except Image.DecompressionBombError:
+        raise InvalidImage(f"Image is larger than {max_pixels // 1_000_000} megapixels.")
+    except (OSError, SyntaxError, ValueError) as e:
+        raise InvalidImage("File is not a valid image.") from e
@@ -0,0 +1,173 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, TemporaryFileUploadHandler
+from django.http import JsonResponse
+from django.template.defaultfilters import filesizeformat
+from .imaging import InvalidImage, normalize_image
+from .models import ImageRendition
+
+# Ingestion of uploaded photos.
+# Uploads stream to a temporary file in chunks, with the byte limit checked as they arrive.
+# Each image is then verified, decoded, turned upright, stripped of metadata and re-encoded
+# (WebP by default) in a process pool, and only the normalized copy is stored.
+
+DEFAULTS = {
+    'MAX_UPLOAD_BYTES': 25 * 1024 * 1024,
+    'MAX_PIXELS': 50_000_000,  # Decoded size limit; larger images are rejected before decoding
+    'MAX_EDGE': 4096,  # Longest edge of the stored copy in pixels, None keeps the original size
+    'FORMAT': 'WEBP',
+    'EXTENSION': '.webp',
+    'QUALITY': 82,
+    'KEEP_ORIGINAL': False,  # Also store the untouched upload, recorded as the "original" rendition
+    'WORKERS': 2,  # Decoding processes; 0 decodes in the request thread
+}
+
+ORIGINAL = "original"
+
+_lock = threading.Lock()
+_executor = None
+_executor_workers = 0
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'IMAGE_INGEST', {})}
+
+
+class ImageRejected(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Skip any uploaded file past max_bytes while it streams, remembering that it did."""
+
+    def __init__(self, request=None, max_bytes=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+        self.rejected = []
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.rejected.append(self.field_name)
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def image_upload(view):
+    """
+    Stream the request's files to disk under the upload size limit.
+    Place above @api_view, so the handlers are set before the body is parsed.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        max_bytes = _config()['MAX_UPLOAD_BYTES']
+        try:
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
+        # Leave room for the other form fields before refusing without reading the body
+        if content_length > max_bytes + 64 * 1024:
+            return JsonResponse({"error": _too_large_message(max_bytes)}, status=413)
+
+        limiter = LimitedUploadHandler(request, max_bytes)
+        request.upload_handlers = [limiter, TemporaryFileUploadHandler(request)]
+        request.image_upload_limiter = limiter
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _too_large_message(max_bytes):
+    return f"Photo is larger than {filesizeformat(max_bytes)}."
+
+
+def rejected_upload(request, field_name):
+    """Return an error message when field_name's file was dropped for exceeding the limit."""
+    limiter = getattr(request, "image_upload_limiter", None)
+    if limiter is not None and field_name in limiter.rejected:
+        return _too_large_message(limiter.max_bytes)
+    return None
+
+
+def _get_executor(workers):
+    global _executor, _executor_workers
+    with _lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # spawn: forking a threaded server process could copy held locks into the workers
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_workers = workers
+        return _executor
+
+
+def normalize_file(source_path, destination_path, config=None):
+    """Run normalize_image with the configured limits, in the process pool when enabled."""
+    config = config or _config()
+    args = (source_path, destination_path, config['FORMAT'], config['QUALITY'],
+            config['MAX_PIXELS'], config['MAX_EDGE'])
+    if not config['WORKERS']:
+        return normalize_image(*args)
+    return _get_executor(config['WORKERS']).submit(normalize_image, *args).result()
+
+
+def ingest_image(upload, model, field_name):
+    """
+    Normalize an uploaded image and store it for model.field_name.
+    Returns the storage name to assign to the field; raises ImageRejected for unusable uploads.
+    """
+    config = _config()
+    if upload.size > config['MAX_UPLOAD_BYTES']:
+        raise ImageRejected(_too_large_message(config['MAX_UPLOAD_BYTES']), status_code=413)
+
+    field = model._meta.get_field(field_name)
+    stem = os.path.splitext(os.path.basename(upload.name))[0] or "photo"
+    name = field.generate_filename(None, stem + config['EXTENSION'])
+
+    # Workers read from disk; uploads held in memory by other handlers are spilled first
+    spilled = None
+    if hasattr(upload, "temporary_file_path"):
+        source_path = upload.temporary_file_path()
+    else:
+        with tempfile.NamedTemporaryFile(delete=False, dir=settings.FILE_UPLOAD_TEMP_DIR) as spilled:
+            for chunk in upload.chunks():
+                spilled.write(chunk)
+        source_path = spilled.name
+
+    fd, output_path = tempfile.mkstemp(suffix=config['EXTENSION'], dir=settings.FILE_UPLOAD_TEMP_DIR)
+    os.close(fd)
+    try:
+        try:
+            _, _, original_width, original_height = normalize_file(source_path, output_path, config)
+        except InvalidImage as e:
+            raise ImageRejected(str(e))
+        with open(output_path, "rb") as output:
+            name = default_storage.save(name, File(output), max_length=field.max_length)
+
+        if config['KEEP_ORIGINAL']:
+            folder, filename = os.path.split(field.generate_filename(None, upload.name))
+            original = default_storage.save(os.path.join(folder, "originals", filename), upload, max_length=255)
+            ImageRendition.objects.update_or_create(
+                source=name, size=ORIGINAL,
+                defaults={'image': original, 'width': original_width, 'height': original_height})
+    finally:
+        os.remove(output_path)
+        if spilled is not None:
+            os.remove(spilled.name)
+
+    return name
@@ -0,0 +1,239 @@
+import logging
+import os
+import threading
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Job
+
+# Durable background jobs without an external broker.
+# Jobs are rows in api_job; a worker thread in each server process claims due rows with a
+# conditional UPDATE, so a job runs in one process even under several gunicorn workers.
+# A running job holds a lease that a heartbeat thread keeps extending; when the process dies
+# the lease runs out and another worker (or this one after a restart) picks the job up again.
+# Failed runs are retried with exponential backoff up to max_attempts.
+#
+# Handlers take (params, context) and return a JSON-serializable result. They should call
+# context.progress(dict) now and then, which is also where cancellation is noticed.
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WORKER': True,  # Run a worker thread in server processes (see backend/wsgi.py)
+    'POLL_SECONDS': 2,  # Idle wait between checks for due jobs
+    'MAX_ATTEMPTS': 3,
+    'BACKOFF_SECONDS': 5,  # Delay before the first retry, doubled for each further one
+    'MAX_BACKOFF_SECONDS': 300,
+    'LEASE_SECONDS': 60,  # A running job whose process stopped heartbeating is reclaimed after this
+    'KEEP_DAYS': 7,  # Finished jobs are pruned after this many days
+}
+
+ACTIVE = ('queued', 'running')
+
+_wake = threading.Event()
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'JOB_QUEUE', {})}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _cleanup_media(params, context):
+    from .cleanup import cleanup_media
+    return cleanup_media(dry_run=bool(params.get('dry_run')), progress=context.progress)
+
+
+def _remove_media(params, context):
+    from .trip_deletion import remove_media_files
+    return remove_media_files(params.get('names', []), progress=context.progress)
+
+
+# kind: handler(params, context)
+HANDLERS = {
+    'cleanup_media': _cleanup_media,
+    'remove_media': _remove_media,
+}
+
+
+class JobContext:
+    """Passed to handlers: the job's id and attempt number, and progress reporting."""
+
+    def __init__(self, job):
+        self.job_id = job.job_id
+        self.attempt = job.attempts
+
+    def progress(self, progress):
+        """Store progress; raises JobCancelled once cancellation has been requested."""
+        Job.objects.filter(pk=self.job_id).update(progress=progress)
+        if Job.objects.filter(pk=self.job_id, cancel_requested=True).exists():
+            raise JobCancelled()
+
+
+def _insert_unless_active(job):
+    """
+    INSERT the unsaved job unless one of the same kind and params is queued or running, as one
+    statement so concurrent callers cannot both pass the check. Returns the new id or None.
+    """
+    fields = [field for field in Job._meta.concrete_fields if not field.primary_key]
+    values = [field.get_db_prep_save(field.pre_save(job, True), connection) for field in fields]
+    params = Job._meta.get_field('params').get_db_prep_save(job.params, connection)
+    table = Job._meta.db_table
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    placeholders = ", ".join(["%s"] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {placeholders} "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE kind = %s AND params = %s AND state IN (%s, %s))",
+            values + [job.kind, params, *ACTIVE])
+        return cursor.lastrowid if cursor.rowcount else None
+
+
+def enqueue(kind, params=None, unique=False, max_attempts=None):
+    """
+    Queue a job; it runs once the current transaction commits.
+    With unique=True an already queued or running job of the same kind and params is returned instead.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, params=params or {}, max_attempts=max_attempts or _config()['MAX_ATTEMPTS'])
+    if not unique:
+        job.save()
+    else:
+        with transaction.atomic():
+            job_id = _insert_unless_active(job)
+            if job_id is None:
+                return Job.objects.filter(kind=kind, params=job.params, state__in=ACTIVE).order_by('job_id').first()
+            job = Job.objects.get(pk=job_id)
+
+    transaction.on_commit(_wake.set)
+    return job
+
+
+def cancel_job(job_id):
+    """
+    Cancel a job: a queued one at once, a running one at its next progress report.
+    Returns the job, or None when it does not exist.
+    """
+    now = timezone.now()
+    Job.objects.filter(pk=job_id, state='queued').update(state='cancelled', date_finished=now)
+    Job.objects.filter(pk=job_id, state='running').update(cancel_requested=True)
+    return Job.objects.filter(pk=job_id).first()
+
+
+def _backoff(attempts):
+    config = _config()
+    return min(config['BACKOFF_SECONDS'] * 2 ** max(attempts - 1, 0), config['MAX_BACKOFF_SECONDS'])
+
+
+def _claim():
+    """Take the next due job, or a running one whose lease ran out; None when nothing is due."""
+    now = timezone.now()
+    due = Q(state='queued', run_after__lte=now) | Q(state='running', lease_expires__lt=now)
+    for job_id in Job.objects.filter(due).order_by('run_after', 'job_id').values_list('pk', flat=True)[:10]:
+        claimed = Job.objects.filter(due, pk=job_id).update(
+            state='running', attempts=F('attempts') + 1, date_started=now,
+            lease_expires=now + timedelta(seconds=_config()['LEASE_SECONDS']))
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def _heartbeat(job_id, stop):
+    lease = _config()['LEASE_SECONDS']
+    try:
+        while not stop.wait(lease / 3):
+            Job.objects.filter(pk=job_id, state='running').update(
+                lease_expires=timezone.now() + timedelta(seconds=lease))
+    except Exception:
+        logger.exception("Heartbeat of job %s failed", job_id)
+    finally:
+        connection.close()
+
+
+def _finish(job, **fields):
+    Job.objects.filter(pk=job.job_id, state='running').update(lease_expires=None, **fields)
+
+
+def run_job(job):
+    """Run one claimed job and record its outcome: success, a retry, failure or cancellation."""
+    handler = HANDLERS.get(job.kind)
+    if handler is None:
+        _finish(job, state='failed', error=f"Unknown job kind: {job.kind}", date_finished=timezone.now())
+        return
+
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job.job_id, stop), daemon=True,
+                     name=f"job-{job.job_id}-heartbeat").start()
+    try:
+        if job.cancel_requested:
+            raise JobCancelled()
+        result = handler(job.params, JobContext(job))
+    except JobCancelled:
+        _finish(job, state='cancelled', date_finished=timezone.now())
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s (%s) attempt %s failed", job.job_id, job.kind, job.attempts, exc_info=True)
+        if job.attempts < job.max_attempts:
+            _finish(job, state='queued', error=error,
+                    run_after=timezone.now() + timedelta(seconds=_backoff(job.attempts)))
+        else:
+            _finish(job, state='failed', error=error, date_finished=timezone.now())
+    else:
+        _finish(job, state='succeeded', result=result, error='', date_finished=timezone.now())
+    finally:
+        stop.set()
+
+
+def run_pending(limit=None):
+    """Run due jobs one after another until none is left (or limit ran); returns how many ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        job = _claim()
+        if job is None:
+            break
+        run_job(job)
+        ran += 1
+    return ran
+
+
+def prune_jobs():
+    """Delete finished jobs older than KEEP_DAYS."""
+    cutoff = timezone.now() - timedelta(days=_config()['KEEP_DAYS'])
+    Job.objects.exclude(state__in=ACTIVE).filter(date_finished__lt=cutoff).delete()
+
+
+def _work():
+    poll = _config()['POLL_SECONDS']
+    pruned = False
+    while True:
+        try:
+            if not pruned:
+                prune_jobs()
+                pruned = True
+            run_pending()
+        except Exception:
+            logger.exception("Job worker iteration failed")
+        finally:
+            connection.close()
+        _wake.wait(poll)
+        _wake.clear()
+
+
+def start_worker():
+    """Start this process's worker thread, once; jobs left over from before a restart resume."""
+    global _worker_pid
+    if not _config()['WORKER']:
+        return
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        _worker_pid = os.getpid()  # A forked process starts its own worker
+        threading.Thread(target=_work, daemon=True, name="job-worker").start()
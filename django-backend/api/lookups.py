@@ -0,0 +1,133 @@
+from collections import Counter
+from django.db import connection, transaction
+from .models import Budget, People, Memories, BudgetRollup, Location, Category, canonical_key, display_name
+from .rollup import rebuild_rollup
+from .search import rebuild_search_index, search_index_exists
+
+# Location and Category lookup tables behind the location/category foreign keys.
+# Names are folded for case and whitespace on write (Location.objects.resolve), so "Paris" and
+# "paris " share one row, and reports group by the integer ids.
+#
+# Databases from before the lookup tables hold the free-text names in the id columns after
+# migrating, as SQLite keeps a column's values when its type changes. Numeric names such as
+# "42" are stored as integers by then, so they are told from ids by matching no lookup row.
+# ensure_lookups converts them after every migrate, merging spellings that fold to the same key
+# under the most used one.
+
+# Scalar subqueries turning a name parameter (passed through canonical_key) into its id in raw SQL
+LOCATION_ID = "(SELECT location_id FROM api_location WHERE key = %s)"
+CATEGORY_ID = "(SELECT category_id FROM api_category WHERE key = %s)"
+
+# Lookup model: the (model, field) pairs referencing it
+SOURCES = {
+    Location: [(Budget, "location"), (People, "met_location"), (Memories, "location")],
+    Category: [(Budget, "category")],
+}
+
+
+def lookup_names(model, ids):
+    """Return {id: name} of the given Location or Category ids, in one query."""
+    return dict(model.objects.filter(pk__in=set(ids)).values_list("pk", "name"))
+
+
+def _legacy_names(cursor, model, field_name):
+    """
+    Return {raw name: uses} of the values in a foreign key column that are still names: text,
+    and numbers that match no lookup row. Read before creating lookup rows, which could take those ids.
+    """
+    field = model._meta.get_field(field_name)
+    table, column = model._meta.db_table, field.column
+    lookup = field.related_model
+    cursor.execute(f"""
+        SELECT {column}, COUNT(*) FROM {table}
+        WHERE typeof({column}) = 'text'
+           OR {column} NOT IN (SELECT {lookup._meta.pk.column} FROM {lookup._meta.db_table})
+        GROUP BY {column}
+    """)
+    return dict(cursor.fetchall())
+
+
+def _replace_numbers(cursor, table, column, ids):
+    """
+    Replace numeric legacy names with ids in one UPDATE through a temporary mapping table, so a new
+    id that equals another legacy number is not converted a second time.
+    """
+    cursor.execute("CREATE TEMP TABLE api_legacy_ids (old PRIMARY KEY, new INTEGER NOT NULL)")
+    try:
+        cursor.executemany("INSERT INTO api_legacy_ids (old, new) VALUES (%s, %s)", list(ids.items()))
+        cursor.execute(f"""
+            UPDATE {table} SET {column} = (SELECT new FROM api_legacy_ids WHERE old = {table}.{column})
+            WHERE typeof({column}) != 'text' AND {column} IN (SELECT old FROM api_legacy_ids)
+        """)
+    finally:
+        cursor.execute("DROP TABLE api_legacy_ids")
+
+
+def convert_legacy_names():
+    """
+    Replace free-text names left in the lookup columns with ids, creating the lookup rows.
+    Spellings that fold to the same key become one row named after the most used spelling.
+    Returns (distinct raw names converted, whether the rollup still holds names).
+    """
+    converted = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for lookup, sources in SOURCES.items():
+            found = {(model, field_name): _legacy_names(cursor, model, field_name) for model, field_name in sources}
+            spellings = Counter()
+            for names in found.values():
+                for raw, uses in names.items():
+                    spellings[(canonical_key(raw), display_name(raw))] += uses
+            if not spellings:
+                continue
+
+            ids = dict(lookup.objects.filter(key__in={key for key, _ in spellings}).values_list("key", "pk"))
+            for (key, name), _ in sorted(spellings.items(), key=lambda item: (-item[1], item[0][1])):
+                if key not in ids:
+                    ids[key] = lookup.objects.create(key=key, name=name).pk
+
+            for (model, field_name), names in found.items():
+                table, column = model._meta.db_table, model._meta.get_field(field_name).column
+                numbers = {raw: ids[canonical_key(raw)] for raw in names if not isinstance(raw, str)}
+                if numbers:  # Before the text names, whose new ids could equal a legacy number
+                    _replace_numbers(cursor, table, column, numbers)
+                cursor.executemany(
+                    f"UPDATE {table} SET {column} = %s WHERE {column} = %s",
+                    [(ids[canonical_key(raw)], raw) for raw in names if isinstance(raw, str)])
+                converted += len(names)
+
+        # The rollup is derived from api_budget: rebuild it rather than merge its groups
+        stale_rollup = any(_legacy_names(cursor, BudgetRollup, name) for name in ("location", "category"))
+    return converted, stale_rollup
+
+
+def ensure_lookups(sender, **kwargs):
+    """post_migrate hook: convert and deduplicate names left behind by the column type change."""
+    converted, stale_rollup = convert_legacy_names()
+    if converted or stale_rollup:
+        with transaction.atomic():
+            rebuild_rollup()
+    if converted and connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            exists = search_index_exists(cursor)
+        if exists:
+            rebuild_search_index()  # Also recreates the triggers, which now read the lookup names
+
+
+# Model field names holding a lookup, and their lookup model
+LOOKUP_FIELDS = {"location": Location, "met_location": Location, "category": Category}
+
+
+def resolve_names(fields, memo=None):
+    """
+    Replace the location and category names in a dict of model field values with their lookup rows,
+    e.g. for queryset.update(), which bypasses the name-accepting foreign key descriptor.
+    memo caches rows across calls, so bulk imports resolve each distinct name once.
+    """
+    memo = {} if memo is None else memo
+    for name, model in LOOKUP_FIELDS.items():
+        if isinstance(fields.get(name), str):
+            key = (model, canonical_key(fields[name]))
+            if key not in memo:
+                memo[key] = model.objects.resolve(fields[name])
+            fields[name] = memo[key]
+    return fields
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from PIL import Image
+from api.ingest import _config, normalize_file
+
+
+class Command(BaseCommand):
+    help = "Measure photo ingestion throughput for a bulk upload of synthetic camera-sized JPEGs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=40, help="Images per run.")
+        parser.add_argument('--width', type=int, default=4032)
+        parser.add_argument('--height', type=int, default=3024)
+        parser.add_argument('--concurrency', type=int, default=4, help="Uploads in flight at once.")
+        parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4],
+                            help="Decoding process counts to compare; 0 decodes in the request thread.")
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        try:
+            source = os.path.join(directory, "source.jpg")
+            # Gradients plus light noise: flat colour would compress unrealistically well, pure noise too badly
+            size = (options['width'], options['height'])
+            gradient = Image.merge("RGB", [Image.linear_gradient("L").resize(size),
+                                           Image.radial_gradient("L").resize(size),
+                                           Image.linear_gradient("L").rotate(90).resize(size)])
+            noise = Image.effect_noise(size, 24).convert("RGB")
+            image = Image.blend(gradient, noise, 0.15)
+            image.save(source, "JPEG", quality=92)
+            source_bytes = os.path.getsize(source)
+            sources = []
+            for i in range(options['count']):
+                path = os.path.join(directory, f"upload_{i}.jpg")
+                shutil.copyfile(source, path)
+                sources.append(path)
+
+            self.stdout.write(f"{options['count']} uploads of {options['width']}x{options['height']} "
+                              f"({source_bytes / 1e6:.1f} MB each), {options['concurrency']} in flight")
+            for workers in options['workers']:
+                config = {**_config(), 'WORKERS': workers}
+                # Warm the pool up so process start-up is not counted
+                normalize_file(sources[0], os.path.join(directory, "warmup.out"), config)
+
+                def ingest(index):
+                    output = os.path.join(directory, f"out_{workers}_{index}{config['EXTENSION']}")
+                    normalize_file(sources[index], output, config)
+                    return os.path.getsize(output)
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                    sizes = list(pool.map(ingest, range(len(sources))))
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"workers={workers}: {len(sources) / elapsed:6.1f} images/s  "
+                    f"{len(sources) * source_bytes / elapsed / 1e6:6.1f} MB/s in  "
+                    f"stored {sum(sizes) / len(sizes) / 1e6:.2f} MB each as {config['FORMAT']}")
+        finally:
+            shutil.rmtree(directory)
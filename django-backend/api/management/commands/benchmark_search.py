@@ -0,0 +1,129 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from api.search import match_expression, rebuild_search_index, search_queries
+
+# Synthetic vocabulary for generated rows
+WORDS = ["dinner", "lunch", "breakfast", "taxi", "train", "museum", "hotel", "hostel", "coffee", "market",
+         "ferry", "tickets", "tour", "souvenir", "pharmacy", "bakery", "gelato", "wine", "tapas", "concert"]
+PLACES = ["Lisbon", "Porto", "Paris", "Rome", "Madrid", "Berlin", "Prague", "Vienna", "Athens", "Kyoto"]
+CATEGORIES = ["Food and Drink", "Transport", "Lodging", "Activities", "Shopping"]
+
+# Only the columns the search index reads
+SCHEMA = [
+    "CREATE TABLE api_location (location_id INTEGER PRIMARY KEY, name TEXT)",
+    "CREATE TABLE api_category (category_id INTEGER PRIMARY KEY, name TEXT)",
+    "CREATE TABLE api_budget (budget_id INTEGER PRIMARY KEY, trip_id INTEGER, label TEXT, "
+    "category_id INTEGER, location_id INTEGER, date TEXT)",
+    "CREATE TABLE api_people (person_id INTEGER PRIMARY KEY, trip_id INTEGER, name TEXT, "
+    "met_location_id INTEGER, met_date TEXT)",
+    "CREATE TABLE api_memories (memory_id INTEGER PRIMARY KEY, trip_id INTEGER, caption TEXT, "
+    "location_id INTEGER, date TEXT)",
+]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the FTS5 search index against a LIKE scan on a synthetic dataset (temporary database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help="Total synthetic rows (80%% budget, 10%% people, 10%% memories).")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query; the median is reported.")
+        parser.add_argument('--seed', type=int, default=348)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "search_benchmark.sqlite3")
+            db = sqlite3.connect(path)
+            try:
+                self.benchmark(db, path, options)
+            finally:
+                db.close()
+
+    def benchmark(self, db, path, options):
+        rows, repeat = options['rows'], options['repeat']
+        rng = random.Random(options['seed'])
+        cursor = db.cursor()
+        for statement in SCHEMA:
+            cursor.execute(statement)
+
+        def text(n):
+            return " ".join(rng.choice(WORDS) for _ in range(n))
+
+        def day():
+            return f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+        def place():
+            return rng.randint(1, len(PLACES))
+
+        start = time.perf_counter()
+        cursor.executemany("INSERT INTO api_location VALUES (?, ?)", enumerate(PLACES, 1))
+        cursor.executemany("INSERT INTO api_category VALUES (?, ?)", enumerate(CATEGORIES, 1))
+        budget_rows = int(rows * 0.8)
+        other_rows = (rows - budget_rows) // 2
+        cursor.executemany("INSERT INTO api_budget VALUES (?, ?, ?, ?, ?, ?)", (
+            (i, rng.randint(1, 200), text(3), rng.randint(1, len(CATEGORIES)), place(), day())
+            for i in range(1, budget_rows + 1)))
+        cursor.executemany("INSERT INTO api_people VALUES (?, ?, ?, ?, ?)", (
+            (i, rng.randint(1, 200), f"Person {i}", place(), day())
+            for i in range(1, other_rows + 1)))
+        cursor.executemany("INSERT INTO api_memories VALUES (?, ?, ?, ?, ?)", (
+            (i, rng.randint(1, 200), text(8), place(), day())
+            for i in range(1, other_rows + 1)))
+        db.commit()
+        self.stdout.write(f"Generated {rows} rows in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        rebuild_search_index(cursor)
+        db.commit()
+        self.stdout.write(f"Built index in {time.perf_counter() - start:.1f}s "
+                          f"(database {os.path.getsize(path) / 1e6:.0f} MB)")
+
+        def timed(sql, params):
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = cursor.execute(sql, params).fetchall()
+                samples.append((time.perf_counter() - start) * 1000)
+            return statistics.median(samples), result
+
+        cases = [
+            ("common word", "dinner", {}),
+            ("two words", "dinner lisbon", {}),
+            ("prefix", "gel", {}),
+            ("rare name", f"Person {other_rows // 2}", {}),
+            ("trip filter", "taxi porto", {"trip_id": 7}),
+            ("date filter", "museum", {"start_date": "2024-03-01", "end_date": "2024-03-31"}),
+        ]
+        for name, query, filters in cases:
+            _, page_query, params = search_queries(match_expression(query), placeholder="?", **filters)
+            elapsed, hits = timed(page_query, params + [20, 0])
+            self.stdout.write(f"FTS5 {name:<12} {elapsed:8.2f} ms  ({len(hits)} hits on first page)")
+
+        # Counting every match is where a LIKE scan has to read the whole table
+        count_query, _, params = search_queries(match_expression("dinner lisbon"), placeholder="?")
+        elapsed, result = timed(count_query, params)
+        self.stdout.write(f"FTS5 count        {elapsed:8.2f} ms  ({result[0][0]} matches)")
+        like_query = """
+            SELECT (SELECT COUNT(*) FROM api_budget JOIN api_category c USING (category_id)
+                    JOIN api_location l USING (location_id)
+                    WHERE (label LIKE ?1 OR c.name LIKE ?1 OR l.name LIKE ?1)
+                      AND (label LIKE ?2 OR c.name LIKE ?2 OR l.name LIKE ?2))
+                 + (SELECT COUNT(*) FROM api_memories JOIN api_location l USING (location_id)
+                    WHERE (caption LIKE ?1 OR l.name LIKE ?1) AND (caption LIKE ?2 OR l.name LIKE ?2))
+                 + (SELECT COUNT(*) FROM api_people p JOIN api_location l ON l.location_id = p.met_location_id
+                    WHERE (p.name LIKE ?1 OR l.name LIKE ?1) AND (p.name LIKE ?2 OR l.name LIKE ?2))
+        """
+        elapsed, result = timed(like_query, ["%dinner%", "%lisbon%"])
+        self.stdout.write(f"LIKE count        {elapsed:8.2f} ms  ({result[0][0]} matches, unranked)")
+
+        # Trigger maintenance cost on writes
+        start = time.perf_counter()
+        cursor.executemany("INSERT INTO api_budget VALUES (?, ?, ?, ?, ?, ?)", (
+            (budget_rows + i, 1, text(3), CATEGORIES.index("Transport") + 1, PLACES.index("Porto") + 1, day()) for i in range(1, 10_001)))
+        db.commit()
+        self.stdout.write(f"10000 indexed inserts in {(time.perf_counter() - start) * 1000:.0f} ms")
@@ -0,0 +1,94 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand
+from api.sqlite_profile import profile_statements
+
+READ_QUERY = """
+    SELECT category, SUM(expense), COUNT(*) FROM api_budget
+    WHERE trip_id = ? GROUP BY category
+"""
+WRITE_QUERY = "INSERT INTO api_budget (trip_id, label, expense, category, location, date) VALUES (?, ?, ?, ?, ?, ?)"
+
+
+class Command(BaseCommand):
+    help = "Compare mixed read/write throughput of the stock SQLite setup and the configured profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000, help="Budget rows in the synthetic database.")
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each run.")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            for name, persistent, statements in (
+                ("stock (rollback journal, connection per request)", False, []),
+                ("profile (settings.SQLITE_PROFILE, persistent connections)", True, profile_statements()),
+            ):
+                path = os.path.join(directory, f"{'profile' if persistent else 'stock'}.sqlite3")
+                self.populate(path, options['rows'])
+                reads, writes, errors = self.run(path, persistent, statements, options)
+                seconds = options['seconds']
+                self.stdout.write(f"{name}\n  reads/s {reads / seconds:9.0f}   writes/s {writes / seconds:7.0f}"
+                                  f"   lock errors {errors}")
+
+    def populate(self, path, rows):
+        rng = random.Random(14)
+        db = sqlite3.connect(path)
+        db.execute("""
+            CREATE TABLE api_budget (budget_id INTEGER PRIMARY KEY, trip_id INTEGER, label TEXT,
+                                     expense REAL, category TEXT, location TEXT, date TEXT)
+        """)
+        db.execute("CREATE INDEX expense_trip_idx ON api_budget (trip_id)")
+        db.executemany(WRITE_QUERY, (
+            (rng.randint(1, 100), "item", rng.uniform(1, 200), rng.choice("ABCDE"), "Lisbon", "2024-01-01")
+            for _ in range(rows)))
+        db.commit()
+        db.close()
+
+    def run(self, path, persistent, statements, options):
+        deadline = time.perf_counter() + options['seconds']
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def connect():
+            db = sqlite3.connect(path)
+            for statement in statements:
+                db.execute(statement)
+            return db
+
+        def worker(write):
+            rng = random.Random()
+            db = connect() if persistent else None
+            done = errors = 0
+            while time.perf_counter() < deadline:
+                conn = db or connect()
+                try:
+                    if write:
+                        conn.execute(WRITE_QUERY, (rng.randint(1, 100), "item", 10.0, "A", "Porto", "2024-02-01"))
+                        conn.commit()
+                    else:
+                        conn.execute(READ_QUERY, (rng.randint(1, 100),)).fetchall()
+                    done += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+                finally:
+                    if db is None:
+                        conn.close()
+            if db is not None:
+                db.close()
+            with lock:
+                counts["writes" if write else "reads"] += done
+                counts["errors"] += errors
+
+        threads = [threading.Thread(target=worker, args=(False,)) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=worker, args=(True,)) for _ in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts["reads"], counts["writes"], counts["errors"]
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from api.cleanup import cleanup_media
+
+
+class Command(BaseCommand):
+    help = "Delete media files that are not referenced by any photo, memory or rendition row."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report what would be deleted.")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Files removed between progress reports.")
+        parser.add_argument('--min-age', type=int, default=300,
+                            help="Skip files modified within this many seconds.")
+
+    def handle(self, *args, **options):
+        def progress(summary):
+            self.stdout.write(f"Deleted {summary['deleted']} files so far ({summary['bytes_reclaimed']} bytes).")
+
+        summary = cleanup_media(dry_run=options['dry_run'], batch_size=max(1, options['batch_size']),
+                                min_age=options['min_age'], progress=progress)
+
+        for name in summary['sample']:
+            self.stdout.write(f"Unused: {name}")
+        verb = "Would delete" if summary['dry_run'] else "Deleted"
+        count = summary['unused'] if summary['dry_run'] else summary['deleted']
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {summary['scanned']} files. {verb} {count} unused files, "
+            f"{summary['bytes_reclaimed']} bytes ({summary['failed']} failed, "
+            f"{summary['skipped_recent']} recent files skipped)."))
@@ -0,0 +1,51 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from api.models import PersonPhoto, Memories, ImageRendition
+from api.renditions import _config, render_file, render_targets, record_renditions
+
+
+class Command(BaseCommand):
+    help = "Backfill thumbnail and medium renditions for existing people and memory photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Number of processes rendering images in parallel.")
+        parser.add_argument('--force', action='store_true',
+                            help="Re-render images that already have every rendition.")
+
+    def handle(self, *args, **options):
+        sizes = set(_config()['SIZES'])
+        sources = set(PersonPhoto.objects.values_list('photo', flat=True))
+        sources |= set(Memories.objects.values_list('memory_photo', flat=True))
+        sources.discard('')
+
+        if not options['force']:
+            done = {}
+            for source, size in ImageRendition.objects.values_list('source', 'size'):
+                done.setdefault(source, set()).add(size)
+            sources = {source for source in sources if not sizes <= done.get(source, set())}
+
+        missing = {source for source in sources if not default_storage.exists(source)}
+        sources -= missing
+        for source in sorted(missing):
+            self.stderr.write(f"Missing file: {source}")
+
+        rendered = failed = 0
+        quality = _config()['QUALITY']
+        # Image work runs in worker processes; the rows are written here in the parent
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            futures = {pool.submit(render_file, default_storage.path(source), render_targets(source), quality): source
+                       for source in sources}
+            for future in as_completed(futures):
+                source = futures[future]
+                try:
+                    record_renditions(source, future.result())
+                    rendered += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Failed to render {source}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} images ({failed} failed, {len(missing)} missing)."))
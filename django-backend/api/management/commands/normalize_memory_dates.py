@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api.memory_dates import normalize_memory_dates
+
+
+class Command(BaseCommand):
+    help = "Convert legacy free-text memory dates to ISO dates, quarantining values that cannot be parsed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many dates would change.")
+
+    def handle(self, *args, **options):
+        converted, quarantined = normalize_memory_dates(dry_run=options['dry_run'])
+        verb = "Would convert" if options['dry_run'] else "Converted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {converted} memory dates; {quarantined} unparseable dates quarantined."))
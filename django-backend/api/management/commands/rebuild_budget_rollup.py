@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.rollup import rebuild_rollup, rollup_mismatches
+
+
+class Command(BaseCommand):
+    help = "Rebuild the budget rollup table from api_budget and check it against the raw rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check-only', action='store_true',
+                            help="Only compare the rollup with api_budget, do not rebuild it.")
+
+    def handle(self, *args, **options):
+        if not options['check_only']:
+            with transaction.atomic():
+                rebuild_rollup()
+            self.stdout.write("Rollup rebuilt.")
+
+        mismatches = rollup_mismatches()
+        if mismatches:
+            for key in mismatches[:20]:
+                self.stderr.write(f"Mismatch: {key}")
+            raise CommandError(f"{len(mismatches)} rollup groups do not match api_budget.")
+
+        self.stdout.write(self.style.SUCCESS("Rollup matches api_budget."))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Recreate the FTS5 search index and its triggers from budget, people and memories."
+
+    def handle(self, *args, **options):
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
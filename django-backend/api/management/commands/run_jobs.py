@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run the background jobs that are due, e.g. when the server is stopped or its worker is disabled."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int,
+                            help="Stop after running this many jobs.")
+
+    def handle(self, *args, **options):
+        ran = run_pending(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} jobs."))
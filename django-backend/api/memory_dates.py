@@ -0,0 +1,81 @@
+import logging
+from datetime import datetime
+from django.db import connection, transaction
+from .models import Memories, MemoryDateQuarantine
+
+# Conversion of legacy free-text Memories.date values to real dates.
+# Memories.date used to be a CharField, so older databases can hold any string there.
+# SQLite keeps those strings when the column becomes a DateField, so they are fixed up here.
+
+logger = logging.getLogger(__name__)
+
+# Formats accepted for legacy values, tried in order (month-first before day-first)
+LEGACY_FORMATS = (
+    "%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d", "%Y%m%d",
+    "%m/%d/%Y", "%m-%d-%Y", "%d/%m/%Y", "%d.%m.%Y",
+    "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%b %d %Y",
+    "%d %B %Y", "%d %b %Y",
+    "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S",
+)
+
+
+def parse_legacy_date(value):
+    """Parse a legacy memory date string; returns a date or None."""
+    value = str(value or "").strip()
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def invalid_memory_dates():
+    """
+    Return (memory_id, raw date, trip creation date) for rows whose date is not a valid ISO date.
+    date(x, '+0 days') != x also catches ISO-shaped but impossible values such as 2024-02-30,
+    which the modifier rolls over to the next month.
+    The column is read through CAST so the sqlite3 date converter never sees the raw text.
+    """
+    query = """
+        SELECT m.memory_id, CAST(m.date AS TEXT), date(t.date_created)
+        FROM api_memories m
+        JOIN api_triprel t ON t.trip_id = m.trip_id
+        WHERE m.date IS NULL OR date(m.date, '+0 days') IS NULL OR date(m.date, '+0 days') != m.date
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(query)
+        return cursor.fetchall()
+
+
+def normalize_memory_dates(dry_run=False):
+    """
+    Rewrite legacy memory dates as ISO dates.
+    Values that cannot be parsed are logged, kept in MemoryDateQuarantine and replaced by
+    the trip's creation date so the column stays valid.
+    Returns (converted, quarantined) counts.
+    """
+    converted = quarantined = 0
+    rows = invalid_memory_dates()
+
+    with transaction.atomic():
+        for memory_id, raw_date, fallback in rows:
+            parsed = parse_legacy_date(raw_date)
+            if parsed:
+                converted += 1
+                if not dry_run:
+                    Memories.objects.filter(memory_id=memory_id).update(date=parsed)
+                continue
+
+            quarantined += 1
+            logger.warning("Memory %s has an unparseable date %r; using %s", memory_id, raw_date, fallback)
+            if not dry_run:
+                MemoryDateQuarantine.objects.create(memory_id=memory_id, raw_date=str(raw_date))
+                Memories.objects.filter(memory_id=memory_id).update(date=fallback)
+
+    return converted, quarantined
+
+
+def ensure_memory_dates(sender, **kwargs):
+    """post_migrate hook: convert legacy memory dates left behind by the column type change."""
+    normalize_memory_dates()
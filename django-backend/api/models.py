@@ -1,7 +1,78 @@
 from django.db import models
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+from django.utils import timezone
 
 # Create your models here.
 
+def display_name(name):
+    """Spelling a location or category name is stored under: surrounding and repeated whitespace removed."""
+    return " ".join(str(name).split())
+
+def canonical_key(name):
+    """Case- and whitespace-folded form of a name; names sharing a key are the same location or category."""
+    return display_name(name).casefold()
+
+class LookupManager(models.Manager):
+    def resolve(self, name):
+        """Return the row for name, creating it under its display spelling if the key is new."""
+        name = display_name(name)
+        obj, _ = self.get_or_create(key=canonical_key(name), defaults={'name': name})
+        return obj
+
+class Location(models.Model):
+    location_id = models.AutoField(primary_key=True)  # Unique ID for each location
+    name = models.CharField(max_length=255)  # Display name (e.g., "Paris")
+    key = models.CharField(max_length=255, unique=True)  # Case- and whitespace-folded name
+
+    objects = LookupManager()
+
+    def __str__(self):
+        return self.name
+
+class Category(models.Model):
+    category_id = models.AutoField(primary_key=True)  # Unique ID for each category
+    name = models.CharField(max_length=100)  # Display name (e.g., "Food and Drink")
+    key = models.CharField(max_length=100, unique=True)  # Case- and whitespace-folded name
+
+    objects = LookupManager()
+
+    class Meta:
+        verbose_name_plural = "categories"
+
+    def __str__(self):
+        return self.name
+
+class LookupDescriptor(ForwardManyToOneDescriptor):
+    """Accepts a plain name as well as a row, so item.location = "Paris" resolves the Location."""
+
+    def __set__(self, instance, value):
+        if isinstance(value, str):
+            value = self.field.related_model.objects.resolve(value)
+        super().__set__(instance, value)
+
+class LookupForeignKey(models.ForeignKey):
+    """
+    Foreign key to Location or Category.
+    There is no database constraint: the migration from the old free-text columns leaves the
+    names in place, and api/lookups.py replaces them with ids after migrating.
+    """
+    forward_related_accessor_class = LookupDescriptor
+
+    def __init__(self, to, **kwargs):
+        kwargs.setdefault('on_delete', models.PROTECT)
+        kwargs.setdefault('db_constraint', False)
+        super().__init__(to, **kwargs)
+
+class WithLookupsManager(models.Manager):
+    """Default manager that joins the lookup tables, so names come with the rows."""
+
+    def __init__(self, *fields):
+        super().__init__()
+        self.lookup_fields = fields
+
+    def get_queryset(self):
+        return super().get_queryset().select_related(*self.lookup_fields)
+
 class Triprel(models.Model):
     trip_id = models.AutoField(primary_key=True)
     trip_name = models.CharField(max_length=255, unique=True)
@@ -15,9 +86,11 @@ class Budget(models.Model):
     trip = models.ForeignKey(Triprel, on_delete=models.CASCADE)  # Links to a trip
     label = models.CharField(max_length=255)  # Expense description (e.g., "Lunch")
     expense = models.DecimalField(max_digits=10, decimal_places=2)  # Expense amount
-    category = models.CharField(max_length=100)  # Category (e.g., "Food and Drink")
-    location = models.CharField(max_length=255)  # Where the expense occurred
+    category = LookupForeignKey(Category)  # Category (e.g., "Food and Drink")
+    location = LookupForeignKey(Location)  # Where the expense occurred
     date = models.DateField()  # Date of the expense
+
+    objects = WithLookupsManager('category', 'location')
     
     class Meta:
         ordering = ['-date']
@@ -34,8 +107,10 @@ class People(models.Model):
     trip = models.ForeignKey(Triprel, on_delete=models.CASCADE) # Links to a trip
     name = models.CharField(max_length=255) # Name of the person
     contact = models.CharField(max_length=255) # Contact of the person
-    met_location = models.CharField(max_length=255) # Where the person was met
+    met_location = LookupForeignKey(Location) # Where the person was met
     met_date = models.DateField() # Date the person was met
+
+    objects = WithLookupsManager('met_location')
     
     class Meta:
         ordering = ['-met_date']
@@ -61,17 +136,106 @@ class Memories(models.Model):
     trip = models.ForeignKey(Triprel, on_delete=models.CASCADE)  # Links to a trip
     memory_photo = models.ImageField(upload_to='memories/')  # Photo of the memory
     caption = models.TextField()  # Caption for the memory
-    location = models.CharField(max_length=255)  # Location of the memory
-    date = models.CharField(max_length=255)  # Store date as a text field (YYYY-MM-DD or any format)
+    location = LookupForeignKey(Location)  # Location of the memory
+    date = models.DateField()  # Date of the memory
+
+    objects = WithLookupsManager('location')
     
     class Meta:
         ordering = ['-date']
         indexes = [
             models.Index(fields=['-date'], name='memory_date_idx'),
             models.Index(fields=['trip', 'location'], name='memory_tl_idx'),
+            models.Index(fields=['trip', 'date'], name='memory_trip_date_idx'),
         ]
 
     def __str__(self):
         return f"Memory {self.memory_id} - {self.trip.trip_name} ({self.location})"
 
 
+class MemoryDateQuarantine(models.Model):
+    quarantine_id = models.AutoField(primary_key=True)  # Unique ID for each quarantined value
+    memory = models.ForeignKey(Memories, on_delete=models.CASCADE)  # Memory whose date could not be parsed
+    raw_date = models.CharField(max_length=255)  # Original free-text date
+    date_quarantined = models.DateTimeField(auto_now_add=True)  # When the value was replaced
+
+    def __str__(self):
+        return f"Memory {self.memory_id} - {self.raw_date}"
+
+
+
+
+class BudgetRollup(models.Model):
+    rollup_id = models.AutoField(primary_key=True)  # Unique ID for each rollup row
+    trip = models.ForeignKey(Triprel, on_delete=models.CASCADE)  # Links to a trip
+    location = LookupForeignKey(Location)  # Location of the grouped expenses
+    category = LookupForeignKey(Category)  # Category of the grouped expenses
+    date = models.DateField()  # Date of the grouped expenses
+    total = models.DecimalField(max_digits=14, decimal_places=2)  # Sum of expenses in the group
+    count = models.IntegerField()  # Number of expenses in the group
+    min_expense = models.DecimalField(max_digits=10, decimal_places=2)  # Smallest expense in the group
+    max_expense = models.DecimalField(max_digits=10, decimal_places=2)  # Largest expense in the group
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['trip', 'location', 'category', 'date'], name='rollup_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='rollup_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.trip_id} {self.location} {self.category} {self.date} - {self.total}"
+
+
+class ImageRendition(models.Model):
+    rendition_id = models.AutoField(primary_key=True)  # Unique ID for each rendition
+    source = models.CharField(max_length=255)  # Storage name of the original image
+    size = models.CharField(max_length=20)  # Rendition name (e.g., "thumb", "medium")
+    image = models.ImageField(max_length=255)  # Resized copy stored next to the original
+    width = models.IntegerField()  # Width of the rendition in pixels
+    height = models.IntegerField()  # Height of the rendition in pixels
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'size'], name='rendition_source_size_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} ({self.size})"
+
+
+class Job(models.Model):
+    STATES = [(state, state) for state in ('queued', 'running', 'succeeded', 'failed', 'cancelled')]
+
+    job_id = models.AutoField(primary_key=True)  # Unique ID for each background job
+    kind = models.CharField(max_length=50)  # Handler name (e.g., "cleanup_media")
+    params = models.JSONField(default=dict)  # Arguments passed to the handler
+    state = models.CharField(max_length=20, choices=STATES, default='queued')  # Lifecycle state
+    progress = models.JSONField(null=True, blank=True)  # Last progress reported by the handler
+    result = models.JSONField(null=True, blank=True)  # Return value of a successful run
+    error = models.TextField(blank=True)  # Error of the last failed attempt
+    attempts = models.IntegerField(default=0)  # Runs started so far
+    max_attempts = models.IntegerField(default=3)  # Runs allowed before the job fails
+    run_after = models.DateTimeField(default=timezone.now)  # Earliest time of the next run (retry backoff)
+    lease_expires = models.DateTimeField(null=True, blank=True)  # A running job past this is reclaimed
+    cancel_requested = models.BooleanField(default=False)  # Checked by the handler at progress reports
+    date_created = models.DateTimeField(auto_now_add=True)  # When the job was queued
+    date_started = models.DateTimeField(null=True, blank=True)  # Start of the latest attempt
+    date_finished = models.DateTimeField(null=True, blank=True)  # When the job succeeded, failed or was cancelled
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'run_after'], name='job_state_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.job_id} - {self.kind} ({self.state})"
+
+
+class DataVersion(models.Model):
+    key = models.CharField(max_length=100, primary_key=True)  # Version key (e.g., "traveltrack:version:trip:3")
+    version = models.BigIntegerField(default=0)  # Bumped on every write, shared by all server processes
+
+    def __str__(self):
+        return f"{self.key} = {self.version}"
@@ -0,0 +1,86 @@
+import base64
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.response import Response
+
+# Opt-in keyset (cursor) pagination for the trip list endpoints.
+# A page is "rows after the last (sort value, id) seen", so the database seeks straight to it
+# through the sort index instead of skipping OFFSET rows.
+
+DEFAULTS = {
+    'DEFAULT_PAGE_SIZE': 50,
+    'MAX_PAGE_SIZE': 500,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'KEYSET_PAGINATION', {})}
+
+
+def encode_cursor(value, pk):
+    """Pack the last (sort value, id) of a page into an opaque token."""
+    raw = json.dumps([str(value), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Unpack a cursor token; raises ValueError when it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        value, pk = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+    # encode_cursor always writes a string value and an integer id
+    if not isinstance(value, str) or not isinstance(pk, int) or isinstance(pk, bool):
+        raise ValueError("Invalid cursor.")
+    return value, pk
+
+
+def wants_page(request):
+    """Pagination is opt-in: only used when the client sends page_size or cursor."""
+    return "page_size" in request.GET or "cursor" in request.GET
+
+
+def keyset_page(request, queryset, sort_field, pk_field, serializer_class, decorate=None):
+    """
+    Return one page of queryset ordered by (-sort_field, pk_field).
+    The response carries the serialized rows and the cursor of the next page (None at the end).
+    decorate(rows, data), when given, can add fields to the serialized rows of the page.
+    """
+    config = _config()
+    try:
+        page_size = int(request.GET.get("page_size", config['DEFAULT_PAGE_SIZE']))
+    except ValueError:
+        return Response({"error": "Page size must be a valid number."}, status=status.HTTP_400_BAD_REQUEST)
+    page_size = min(max(page_size, 1), config['MAX_PAGE_SIZE'])
+
+    queryset = queryset.order_by(f"-{sort_field}", pk_field)
+
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            value, pk = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f"{sort_field}__lt": value}) | Q(**{sort_field: value, f"{pk_field}__gt": pk}))
+        except (ValueError, ValidationError):
+            return Response({"error": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Fetch one extra row to know whether another page exists
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_field), getattr(last, pk_field))
+
+    data = serializer_class(rows, many=True).data
+    if decorate:
+        decorate(rows, data)
+
+    return Response({
+        "results": data,
+        "next_cursor": next_cursor
+    })
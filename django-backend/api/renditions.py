@@ -0,0 +1,170 @@
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+from backend.media import HASH_LENGTH
+from .models import ImageRendition, PersonPhoto, Memories
+
+# Thumbnail and medium-size copies of uploaded photos.
+# Renditions are written under <upload dir>/renditions/<size>/ next to the original and recorded
+# in ImageRendition so the photo endpoints can hand out small files instead of full uploads.
+# Like uploads, each rendition is named after a hash of its own bytes (see backend/media.py), so
+# re-rendering with other settings writes a new file instead of changing one cached as immutable.
+# Superseded files are left to the cleanup_media job.
+
+DEFAULTS = {
+    'SIZES': {'thumb': 256, 'medium': 1024},  # Longest edge in pixels per rendition
+    'QUALITY': 85,  # JPEG/WebP encoder quality
+    'WORKERS': 2,  # Threads rendering uploads in the background
+}
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'IMAGE_RENDITIONS', {})}
+
+
+def rendition_name(source, size, digest=None):
+    """
+    Storage name of one rendition of source, e.g. images/renditions/thumb/a.3f2a9c0d.9b1e4c7a.jpg
+    with the hash of the rendition's content as digest, or the name the digest is added to.
+    """
+    folder, filename = os.path.split(source)
+    name = f"{folder}/renditions/{size}/{filename}" if folder else f"renditions/{size}/{filename}"
+    return _with_digest(name, digest) if digest else name
+
+
+def _with_digest(name, digest):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+def render_file(source_path, targets, quality):
+    """
+    Write resized copies of one image file.
+    targets is a list of (size name, longest edge, destination path); each copy is written with
+    the hash of its content added to the destination name.
+    Returns [(size name, width, height, hash)]. Touches no database, so it is safe in a process pool.
+    """
+
+    results = []
+    with Image.open(source_path) as original:
+        image_format = original.format or "JPEG"
+        image = ImageOps.exif_transpose(original)
+        for size, edge, destination in targets:
+            copy = image.copy()
+            copy.thumbnail((edge, edge))
+            if image_format == "JPEG" and copy.mode not in ("RGB", "L"):
+                copy = copy.convert("RGB")
+            encoded = io.BytesIO()
+            copy.save(encoded, format=image_format, quality=quality)
+            digest = hashlib.sha256(encoded.getbuffer()).hexdigest()[:HASH_LENGTH]
+            destination = _with_digest(destination, digest)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            # Readers of an existing file with this name see the same bytes before and after the replace
+            partial = f"{destination}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(partial, "wb") as file:
+                file.write(encoded.getbuffer())
+            os.replace(partial, destination)
+            results.append((size, copy.width, copy.height, digest))
+    return results
+
+
+def render_targets(source):
+    """Return the (size, edge, destination path before the content hash) targets for one stored image."""
+    return [(size, edge, default_storage.path(rendition_name(source, size)))
+            for size, edge in _config()['SIZES'].items()]
+
+
+def _source_exists(source):
+    return (PersonPhoto.objects.filter(photo=source).exists()
+            or Memories.objects.filter(memory_photo=source).exists())
+
+
+def record_renditions(source, results):
+    """
+    Store the rendition rows for one source image. When the source was deleted while it was
+    rendering, the files are removed instead, so no row keeps them referenced for cleanup.
+    """
+    names = [rendition_name(source, size, digest) for size, _, _, digest in results]
+    with transaction.atomic():
+        if _source_exists(source):
+            for (size, width, height, _), name in zip(results, names):
+                ImageRendition.objects.update_or_create(
+                    source=source, size=size, defaults={'image': name, 'width': width, 'height': height})
+            return
+    _delete_files(names)
+
+
+def generate_renditions(source):
+    """Render and record every configured rendition of one stored image."""
+    results = render_file(default_storage.path(source), render_targets(source), _config()['QUALITY'])
+    record_renditions(source, results)
+
+
+def _background_render(source, trip_id):
+    from .cache import bump_data_version
+    try:
+        generate_renditions(source)
+        bump_data_version(trip_id)
+    except Exception as e:
+        print(f"Failed to render {source}: {e}")
+    finally:
+        connection.close()
+
+
+def schedule_renditions(source, trip_id=None):
+    """
+    Render an uploaded image in the bounded worker pool once the current transaction commits.
+    Cached report responses for the trip are invalidated when the renditions are ready.
+    """
+    transaction.on_commit(lambda: _get_executor().submit(_background_render, source, trip_id))
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_config()['WORKERS'], thread_name_prefix="renditions")
+        return _executor
+
+
+def _delete_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError as e:
+            print(f"Failed to delete {name}: {e}")
+
+
+def delete_renditions(sources):
+    """
+    Remove the rendition rows of the given source images, and their files once the current
+    transaction commits, so a rollback keeps both.
+    """
+    renditions = ImageRendition.objects.filter(source__in=list(sources))
+    names = [name for name in renditions.values_list('image', flat=True) if name]
+    renditions.delete()
+    transaction.on_commit(lambda: _delete_files(names))
+
+
+def rendition_map(sources):
+    """Return {source: {size: storage name}} for the given sources in one query."""
+    renditions = {}
+    for source, size, image in ImageRendition.objects.filter(
+            source__in=list(sources)).values_list('source', 'size', 'image'):
+        renditions.setdefault(source, {})[size] = image
+    return renditions
+
+
+def rendition_urls(sources):
+    """Return {source: {size: URL}} for the given sources in one query."""
+    return {source: {size: default_storage.url(name) for size, name in sizes.items()}
+            for source, sizes in rendition_map(sources).items()}
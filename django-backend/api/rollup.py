@@ -0,0 +1,99 @@
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from .models import Budget, BudgetRollup
+
+
+def rollup_key(budget_item):
+    """Return the (trip_id, location_id, category_id, date) rollup key of a budget item."""
+    return (budget_item.trip_id, budget_item.location_id, budget_item.category_id, budget_item.date)
+
+
+def refresh_rollup(keys):
+    """
+    Recompute the rollup rows for the given keys from the raw Budget rows.
+    Each key only covers one trip/location/category/date group, so this stays cheap.
+    Call inside the same transaction as the Budget write.
+    """
+    for trip_id, location_id, category_id, date in set(keys):
+        stats = Budget.objects.filter(
+            trip_id=trip_id, location_id=location_id, category_id=category_id, date=date
+        ).aggregate(
+            total=Sum('expense'), count=Count('budget_id'),
+            min_expense=Min('expense'), max_expense=Max('expense'))
+
+        if not stats['count']:
+            BudgetRollup.objects.filter(
+                trip_id=trip_id, location_id=location_id, category_id=category_id, date=date).delete()
+            continue
+
+        BudgetRollup.objects.update_or_create(
+            trip_id=trip_id, location_id=location_id, category_id=category_id, date=date,
+            defaults=stats)
+
+
+def rebuild_rollup():
+    """Rebuild the whole rollup table from api_budget. Call inside a transaction."""
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM api_budgetrollup")
+        cursor.execute("""
+            INSERT INTO api_budgetrollup (trip_id, location_id, category_id, date, total, count, min_expense, max_expense)
+            SELECT trip_id, location_id, category_id, date, SUM(expense), COUNT(*), MIN(expense), MAX(expense)
+            FROM api_budget
+            GROUP BY trip_id, location_id, category_id, date
+        """)
+
+
+def rollup_mismatches():
+    """
+    Compare the rollup against aggregates over api_budget.
+    Returns a list of keys whose rollup row is missing, stale or orphaned.
+    """
+    query = """
+        SELECT trip_id, location_id, category_id, date, SUM(expense), COUNT(*), MIN(expense), MAX(expense)
+        FROM api_budget
+        GROUP BY trip_id, location_id, category_id, date
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(query)
+        raw = {tuple(row[:4]): tuple(row[4:]) for row in cursor.fetchall()}
+        cursor.execute("""
+            SELECT trip_id, location_id, category_id, date, total, count, min_expense, max_expense
+            FROM api_budgetrollup
+        """)
+        rolled = {tuple(row[:4]): tuple(row[4:]) for row in cursor.fetchall()}
+
+    mismatches = []
+    for key in raw.keys() | rolled.keys():
+        expected = raw.get(key)
+        actual = rolled.get(key)
+        if expected is None or actual is None:
+            mismatches.append(key)
+        elif expected[1] != actual[1] or any(
+                round(float(a), 2) != round(float(b), 2)
+                for a, b in zip(expected[:1] + expected[2:], actual[:1] + actual[2:])):
+            mismatches.append(key)
+    return mismatches
+
+
+def ensure_rollup(sender, **kwargs):
+    """post_migrate hook: build the rollup for databases that predate it."""
+    if BudgetRollup.objects.exists() or not Budget.objects.exists():
+        return
+    with transaction.atomic():
+        rebuild_rollup()
+
+
+def refresh_trip_rollup(trip_id):
+    """
+    Recompute every rollup row of one trip with two set-based statements.
+    Used after bulk writes where refreshing keys one by one would cost a query per group.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM api_budgetrollup WHERE trip_id = %s", [trip_id])
+        cursor.execute("""
+            INSERT INTO api_budgetrollup (trip_id, location_id, category_id, date, total, count, min_expense, max_expense)
+            SELECT trip_id, location_id, category_id, date, SUM(expense), COUNT(*), MIN(expense), MAX(expense)
+            FROM api_budget
+            WHERE trip_id = %s
+            GROUP BY trip_id, location_id, category_id, date
+        """, [trip_id])
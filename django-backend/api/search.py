@@ -0,0 +1,166 @@
+import logging
+import re
+from django.db import connection, transaction
+from django.db.utils import OperationalError
+
+# SQLite FTS5 full-text index over budget items, memories and people.
+# api_search is kept in sync by SQL triggers on the source tables, so every write path
+# (views, bulk_create, queryset.update, cascades, raw SQL) updates it in the same transaction.
+# rowid = source id * 3 + kind code, which lets the triggers delete an entry by rowid instead
+# of scanning the index.
+
+logger = logging.getLogger(__name__)
+
+# Indexed name of a location or category id column; {} is the new./old./alias prefix
+LOCATION_NAME = "(SELECT name FROM api_location WHERE location_id = {}%s)"
+CATEGORY_NAME = "(SELECT name FROM api_category WHERE category_id = {}category_id)"
+
+# kind: (code, table, id column, date column, title, body, location)
+SOURCES = {
+    "budget": (0, "api_budget", "budget_id", "date", "label", CATEGORY_NAME, LOCATION_NAME % "location_id"),
+    "people": (1, "api_people", "person_id", "met_date", "name", "''", LOCATION_NAME % "met_location_id"),
+    "memories": (2, "api_memories", "memory_id", "date", "caption", "''", LOCATION_NAME % "location_id"),
+}
+
+# Column weights for bm25(): kind, row_id, trip_id, date are unindexed, then title, body, location
+RANK = "bm25(api_search, 0, 0, 0, 0, 3.0, 1.0, 2.0)"
+
+CREATE_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_search USING fts5(
+        kind UNINDEXED, row_id UNINDEXED, trip_id UNINDEXED, date UNINDEXED,
+        title, body, location,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+
+def _entry_values(kind, prefix):
+    """SQL value list for one source row, reading columns from new./old. or a table alias."""
+    code, _, id_column, date_column, title, body, location = SOURCES[kind]
+    column = (lambda name: name if name.startswith("'") else name.format(prefix) if "{}" in name else f"{prefix}{name}")
+    return (f"{prefix}{id_column} * 3 + {code}, '{kind}', {prefix}{id_column}, {prefix}trip_id, "
+            f"{prefix}{date_column}, {column(title)}, {column(body)}, {column(location)}")
+
+
+def trigger_statements():
+    """CREATE TRIGGER statements keeping api_search in step with the source tables."""
+    columns = "rowid, kind, row_id, trip_id, date, title, body, location"
+    statements = []
+    for kind, (code, table, id_column, *_) in SOURCES.items():
+        insert = f"INSERT INTO api_search ({columns}) VALUES ({_entry_values(kind, 'new.')});"
+        delete = f"DELETE FROM api_search WHERE rowid = old.{id_column} * 3 + {code};"
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS api_search_{kind}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS api_search_{kind}_au AFTER UPDATE ON {table} BEGIN {delete} {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS api_search_{kind}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        ]
+    return statements
+
+
+def populate_statements():
+    """INSERT ... SELECT statements filling api_search from the source tables."""
+    columns = "rowid, kind, row_id, trip_id, date, title, body, location"
+    return [f"INSERT INTO api_search ({columns}) SELECT {_entry_values(kind, 's.')} FROM {table} s"
+            for kind, (_, table, *_) in SOURCES.items()]
+
+
+def search_index_exists(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'api_search'")
+    return cursor.fetchone() is not None
+
+
+def rebuild_search_index(cursor=None):
+    """Drop and recreate api_search and its triggers, then index every source row."""
+    def run(cursor):
+        for kind in SOURCES:
+            for suffix in ("ai", "au", "ad"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS api_search_{kind}_{suffix}")
+        cursor.execute("DROP TABLE IF EXISTS api_search")
+        cursor.execute(CREATE_TABLE)
+        for statement in populate_statements() + trigger_statements():
+            cursor.execute(statement)
+        cursor.execute("INSERT INTO api_search (api_search) VALUES ('optimize')")
+
+    if cursor is not None:
+        return run(cursor)
+    with transaction.atomic(), connection.cursor() as cursor:
+        run(cursor)
+
+
+def ensure_search_index(sender, **kwargs):
+    """post_migrate hook: create and fill the search index if it does not exist yet."""
+    if connection.vendor != "sqlite":
+        return
+    try:
+        with connection.cursor() as cursor:
+            exists = search_index_exists(cursor)
+        if not exists:
+            rebuild_search_index()
+        else:
+            # Tables recreated by a migration lose their triggers
+            with connection.cursor() as cursor:
+                for statement in trigger_statements():
+                    cursor.execute(statement)
+    except OperationalError as e:
+        logger.warning("Full-text search is unavailable: %s", e)
+
+
+def match_expression(text):
+    """
+    Turn free text into a safe FTS5 query: every word becomes a quoted prefix term,
+    and all terms must match. Returns None when there is nothing to search for.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+def search_queries(expression, trip_id=None, start_date=None, end_date=None, kinds=None, placeholder="%s"):
+    """
+    Build the (count query, page query, params) of a search; the page query takes limit and offset last.
+    placeholder lets the benchmark run the same SQL through the plain sqlite3 module.
+    """
+    where = f"api_search MATCH {placeholder}"
+    params = [expression]
+    if trip_id:
+        where += f" AND trip_id = {placeholder}"
+        params.append(trip_id)
+    if start_date and end_date:
+        where += f" AND date BETWEEN {placeholder} AND {placeholder}"
+        params.extend([start_date, end_date])
+    if kinds:
+        where += f" AND kind IN ({', '.join([placeholder] * len(kinds))})"
+        params.extend(kinds)
+
+    count_query = f"SELECT COUNT(*) FROM api_search WHERE {where}"
+    page_query = f"""
+        SELECT kind, row_id, trip_id, date, {RANK} AS score,
+               snippet(api_search, -1, '<b>', '</b>', '…', 12)
+        FROM api_search
+        WHERE {where}
+        ORDER BY score
+        LIMIT {placeholder} OFFSET {placeholder}
+    """
+    return count_query, page_query, params
+
+
+def search(text, trip_id=None, start_date=None, end_date=None, kinds=None, limit=20, offset=0):
+    """
+    Return (hits, total) for a free-text query, best matches first.
+    Each hit carries its kind, source id, trip, date, bm25 score and a highlighted snippet.
+    """
+    expression = match_expression(text)
+    if not expression:
+        return [], 0
+
+    count_query, page_query, params = search_queries(expression, trip_id, start_date, end_date, kinds)
+    with connection.cursor() as cursor:
+        cursor.execute(count_query, params)
+        total = cursor.fetchone()[0]
+        cursor.execute(page_query, params + [limit, offset])
+        hits = [
+            {"kind": kind, "id": row_id, "trip_id": trip, "date": date, "score": score, "snippet": snippet}
+            for kind, row_id, trip, date, score, snippet in cursor.fetchall()
+        ]
+    return hits, total
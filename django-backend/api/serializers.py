@@ -1,17 +1,32 @@
 from rest_framework import serializers
-from .models import Triprel, Budget, People, PersonPhoto, Memories
+from .models import Triprel, Budget, People, PersonPhoto, Memories, Job
 
 class TriprelSerializer(serializers.ModelSerializer):
     class Meta:
         model = Triprel
         fields = ['trip_id', 'trip_name', 'date_created']
+
+class TripStatsSerializer(TriprelSerializer):
+    """Trip with the aggregates annotated by get_trips(include_stats=true)."""
+    total_spend = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    expense_count = serializers.IntegerField(read_only=True)
+    people_count = serializers.IntegerField(read_only=True)
+    memory_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TriprelSerializer.Meta):
+        fields = TriprelSerializer.Meta.fields + ['total_spend', 'expense_count', 'people_count', 'memory_count']
         
 class BudgetSerializer(serializers.ModelSerializer):
+    category = serializers.CharField(source='category.name', read_only=True)
+    location = serializers.CharField(source='location.name', read_only=True)
+
     class Meta:
         model = Budget
         fields = ['budget_id', 'trip_id', 'label', 'expense', 'category', 'location', 'date']
         
 class PeopleSerializer(serializers.ModelSerializer):
+    met_location = serializers.CharField(source='met_location.name', read_only=True)
+
     class Meta:
         model = People
         fields = ['person_id', 'trip_id', 'name', 'contact', 'met_location', 'met_date']
@@ -22,7 +37,14 @@ class PersonPhotoSerializer(serializers.ModelSerializer):
         fields = ['photo_id', 'trip_id', 'person_id', 'photo']
         
 class MemoriesSerializer(serializers.ModelSerializer):
+    location = serializers.CharField(source='location.name', read_only=True)
+
     class Meta:
         model = Memories
         fields = ['memory_id', 'trip_id', 'memory_photo', 'caption', 'location', 'date']
 
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['job_id', 'kind', 'state', 'progress', 'result', 'error', 'attempts', 'max_attempts',
+                  'run_after', 'cancel_requested', 'date_created', 'date_started', 'date_finished']
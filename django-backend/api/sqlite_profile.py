@@ -0,0 +1,34 @@
+from django.conf import settings
+
+# Connection profile for SQLite, applied to every new connection by a connection_created hook.
+# WAL lets report reads run while a write is in progress, busy_timeout makes writers wait for the
+# lock instead of failing with "database is locked", and the cache/mmap settings keep hot pages
+# in memory. Set a key to None in settings.SQLITE_PROFILE to leave that pragma at SQLite's default.
+
+DEFAULTS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # Durable in WAL mode except for the last commits on power loss
+    'cache_size': -64000,  # Negative values are KiB: 64 MB page cache per connection
+    'mmap_size': 268435456,  # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,  # Milliseconds
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'SQLITE_PROFILE', {})}
+
+
+def profile_statements(profile=None):
+    """PRAGMA statements for a profile (the configured one by default)."""
+    profile = _config() if profile is None else profile
+    return [f"PRAGMA {name} = {value}" for name, value in profile.items() if value is not None]
+
+
+def apply_sqlite_profile(sender, connection, **kwargs):
+    """connection_created hook: apply the SQLite profile to a freshly opened connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in profile_statements():
+            cursor.execute(statement)
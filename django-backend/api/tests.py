@@ -1,3 +1,302 @@
-from django.test import TestCase
+import datetime
+import json
+import unittest
+from django.db.models.deletion import Collector
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from .models import Triprel, Budget, People, PersonPhoto, Memories, Location, Job
+from .columnar import budget_engine, np
+from .jobs import HANDLERS, cancel_job, enqueue, run_pending
+from .lookups import ensure_lookups
+from .rollup import rebuild_rollup, rollup_mismatches
+from .views import _expense_summary, _expense_breakdown
 
-# Create your tests here.
+class TripBundleTests(TestCase):
+    def make_trip(self, name, size):
+        trip = Triprel.objects.create(trip_name=name)
+        for i in range(size):
+            Budget.objects.create(trip=trip, label=f"Item {i}", expense=i + 1, category="Food",
+                                  location="Paris", date=datetime.date(2024, 1, 1))
+            person = People.objects.create(trip=trip, name=f"Person {i}", contact="-",
+                                           met_location="Paris", met_date=datetime.date(2024, 1, 1))
+            PersonPhoto.objects.create(trip=trip, person=person, photo=f"images/old_{i}.jpg")
+            PersonPhoto.objects.create(trip=trip, person=person, photo=f"images/new_{i}.jpg")
+            Memories.objects.create(trip=trip, memory_photo=f"memories/{i}.jpg", caption="-",
+                                    location="Paris", date="2024-01-01")
+        return trip
+
+    def test_bundle_query_count_is_constant(self):
+        small = self.make_trip("Small", 1)
+        large = self.make_trip("Large", 25)
+
+        # ETag version, trip, budget, people, person photos, memories, renditions
+        with self.assertNumQueries(7):
+            response = self.client.get(f"/api/trip/{small.trip_id}/bundle/")
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(7):
+            response = self.client.get(f"/api/trip/{large.trip_id}/bundle/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["budget"]), 25)
+        self.assertEqual(len(response.data["memories"]), 25)
+
+    def test_bundle_attaches_latest_photo(self):
+        trip = self.make_trip("Photos", 2)
+        People.objects.create(trip=trip, name="No photo", contact="-",
+                              met_location="Paris", met_date=datetime.date(2024, 1, 2))
+
+        response = self.client.get(f"/api/trip/{trip.trip_id}/bundle/")
+        photos = {person["name"]: person["photo"] for person in response.data["people"]}
+        self.assertEqual(photos["Person 0"], "/media/images/new_0.jpg")
+        self.assertEqual(photos["Person 1"], "/media/images/new_1.jpg")
+        self.assertIsNone(photos["No photo"])
+
+    def test_bundle_missing_trip(self):
+        response = self.client.get("/api/trip/999/bundle/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_reports_count_distinct_locations(self):
+        trip = self.make_trip("Visited", 1)
+        Budget.objects.create(trip=trip, label="Train", expense=5, category="Transport",
+                              location="Lyon", date=datetime.date(2024, 1, 2))
+        People.objects.create(trip=trip, name="Guide", contact="-",
+                              met_location="Rome", met_date=datetime.date(2024, 1, 3))
+
+        secondary = self.client.get(f"/api/report/secondary-summary/?trip_id={trip.trip_id}").json()
+        full = self.client.get(f"/api/report/full/?trip_id={trip.trip_id}").json()
+        self.assertEqual(secondary["locations_visited"], 3)
+        self.assertEqual(full["secondary_summary"]["locations_visited"], 3)
+
+    def test_invalid_import_rows_are_reported(self):
+        trip = self.make_trip("Import", 1)
+        valid = {"label": "Taxi", "expense": "12.345", "category": "Transport", "location": "Paris", "date": "2024-01-02"}
+        rows = [valid, {**valid, "expense": 123456789012}, {**valid, "expense": "nan"},
+                {**valid, "label": ["x"], "category": {"a": 1}}]
+        upload = SimpleUploadedFile("rows.ndjson", "\n".join(json.dumps(row) for row in rows).encode())
+        response = self.client.post(f"/api/trip/{trip.trip_id}/budget/import/", {"file": upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["imported"], 1)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3, 4])
+        self.assertEqual(str(Budget.objects.get(label="Taxi").expense), "12.34")
+
+    def test_invalid_batch_expense_is_rejected(self):
+        trip = self.make_trip("Patch", 1)
+        budget_id = Budget.objects.get(trip=trip).budget_id
+        for expense in ("inf", "100000000"):
+            response = self.client.put(f"/api/trip/{trip.trip_id}/budget/batch/edit/",
+                                       {"ids": [budget_id], "patch": {"expense": expense}}, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("Expense", response.data["error"])
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class BudgetEngineTests(TestCase):
+    FILTERS = [
+        (None, None, None, None, None),
+        ("{trip}", None, None, None, None),
+        (None, "Paris", None, None, None),
+        ("{trip}", "Rome", "Food", None, None),
+        (None, None, "Hotel", "2024-01-03", "2024-01-10"),
+        ("{trip}", "Paris", None, "2024-01-01", "2024-01-05"),
+        (None, "Nowhere", None, None, None),
+        (None, None, None, "2025-01-01", "2025-12-31"),
+    ]
+
+    def setUp(self):
+        budget_engine.invalidate()
+        self.trip = Triprel.objects.create(trip_name="Engine")
+        other = Triprel.objects.create(trip_name="Other")
+        for i in range(60):
+            Budget.objects.create(trip=self.trip if i % 3 else other, label=f"Item {i}",
+                                  expense=f"{(i * 37) % 200 + 0.25:.2f}",
+                                  category=["Food", "Hotel", "Transport", "Tickets"][i % 4],
+                                  location=["Paris", "Rome", "Lyon"][i % 3 - (i % 5 == 0)],
+                                  date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 14))
+        rebuild_rollup()
+
+    def tearDown(self):
+        budget_engine.invalidate()
+
+    def assert_matches_sql(self):
+        for filters in self.FILTERS:
+            filters = tuple(value.format(trip=self.trip.trip_id) if value else value for value in filters)
+            with self.subTest(filters=filters):
+                with override_settings(BUDGET_ENGINE={'ENABLED': False}):
+                    expected = _expense_summary(*filters)
+                    expected_pies = {column: _expense_breakdown(column, *filters) for column in ("category", "location")}
+                summary = _expense_summary(*filters)
+                for key in ("total_expense", "average_expense", "max_expense", "min_expense"):
+                    self.assertAlmostEqual(summary[key], expected[key], places=6)
+                self.assertEqual(summary["number_of_expenses"], expected["number_of_expenses"])
+                self.assertEqual(summary["last_date"], expected["last_date"])
+                for column, rows in expected_pies.items():
+                    totals = {row[column]: row["total"] for row in _expense_breakdown(column, *filters)}
+                    self.assertEqual(totals.keys(), {row[column] for row in rows})
+                    for row in rows:
+                        self.assertAlmostEqual(totals[row[column]], row["total"], places=6)
+
+    def test_engine_matches_sql(self):
+        self.assert_matches_sql()
+        self.assertEqual(budget_engine.stats()["rows"], 60)
+
+    def test_incremental_updates_match_sql(self):
+        self.assert_matches_sql()
+        rebuilds = budget_engine.stats()["rebuilds"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Budget.objects.create(trip=self.trip, label="New", expense="999.99", category="Souvenirs",
+                                  location="Nice", date=datetime.date(2024, 1, 4))
+            changed = Budget.objects.filter(category__name="Food").first()
+            changed.category, changed.expense = "Hotel", "12.50"
+            changed.save()
+            removed = Budget.objects.filter(location__name="Lyon").first()
+            self.client.delete(f"/api/trip/{removed.trip_id}/budget/{removed.budget_id}/delete/")
+            self.client.delete(f"/api/trip/{self.trip.trip_id}/budget/batch/delete/",
+                               {"filter": {"category": "Tickets"}}, content_type="application/json")
+        rebuild_rollup()
+
+        self.assert_matches_sql()
+        self.assertEqual(budget_engine.stats()["rebuilds"], rebuilds)
+
+    def test_budget_querysets_fast_delete(self):
+        # A post_delete receiver would make every batch delete load its rows first
+        self.assertTrue(Collector(using="default").can_fast_delete(Budget.objects.all()))
+
+
+@override_settings(JOB_QUEUE={'MAX_ATTEMPTS': 3, 'BACKOFF_SECONDS': 5, 'MAX_BACKOFF_SECONDS': 300, 'LEASE_SECONDS': 60})
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def failing(params, context):
+            self.calls.append(context.attempt)
+            context.progress({"attempt": context.attempt})
+            raise RuntimeError("boom")
+
+        def cancelling(params, context):
+            self.calls.append(context.attempt)
+            cancel_job(context.job_id)
+            context.progress({"step": 1})
+            return "not reached"
+
+        def succeeding(params, context):
+            self.calls.append(context.attempt)
+            return {"echo": params}
+
+        handlers = mock.patch.dict(HANDLERS, failing=failing, cancelling=cancelling, succeeding=succeeding)
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+    def assert_retry_in(self, job, seconds):
+        delay = (job.run_after - timezone.now()).total_seconds()
+        self.assertTrue(seconds - 2 < delay <= seconds, delay)
+
+    def test_failing_job_is_retried_with_backoff_then_fails(self):
+        with self.assertLogs("api.jobs", "WARNING"):
+            job = enqueue("failing")
+
+            self.assertEqual(run_pending(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.state, job.attempts, job.progress), ("queued", 1, {"attempt": 1}))
+            self.assertIn("RuntimeError: boom", job.error)
+            self.assert_retry_in(job, 5)
+            self.assertEqual(run_pending(), 0)  # Not due before the backoff ends
+
+            self.make_due(job)
+            self.assertEqual(run_pending(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.state, job.attempts), ("queued", 2))
+            self.assert_retry_in(job, 10)
+
+            self.make_due(job)
+            self.assertEqual(run_pending(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.state, job.attempts), ("failed", 3))
+            self.assertIsNotNone(job.date_finished)
+            self.assertEqual(self.calls, [1, 2, 3])
+
+    def test_cancel_queued_job(self):
+        job = enqueue("succeeding")
+        response = self.client.post(f"/api/jobs/{job.job_id}/cancel/")
+        self.assertEqual(response.data["state"], "cancelled")
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(self.calls, [])
+
+    def test_cancel_running_job_at_progress_report(self):
+        job = enqueue("cancelling")
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.state, job.result, job.attempts), ("cancelled", None, 1))
+        self.assertEqual(self.calls, [1])
+
+    def test_expired_lease_is_reclaimed(self):
+        live = enqueue("succeeding", {"job": "live"})
+        stale = enqueue("succeeding", {"job": "stale"})
+        now = timezone.now()
+        Job.objects.filter(pk=live.pk).update(state="running", attempts=1, lease_expires=now + datetime.timedelta(seconds=30))
+        Job.objects.filter(pk=stale.pk).update(state="running", attempts=1, lease_expires=now - datetime.timedelta(seconds=1))
+
+        self.assertEqual(run_pending(), 1)
+        stale.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual((stale.state, stale.attempts, stale.result), ("succeeded", 2, {"echo": {"job": "stale"}}))
+        self.assertEqual(live.state, "running")
+
+    def test_unique_enqueue_reuses_active_job(self):
+        first = enqueue("succeeding", {"dry_run": True}, unique=True)
+        self.assertEqual(enqueue("succeeding", {"dry_run": True}, unique=True).job_id, first.job_id)
+        other = enqueue("succeeding", {"dry_run": False}, unique=True)
+        self.assertNotEqual(other.job_id, first.job_id)
+
+        run_pending()
+        again = enqueue("succeeding", {"dry_run": True}, unique=True)
+        self.assertNotEqual(again.job_id, first.job_id)
+        self.assertEqual(again.state, "queued")
+        self.assertEqual(Job.objects.filter(kind="succeeding").count(), 3)
+
+
+class LegacyNameTests(TestCase):
+    def setUp(self):
+        self.trip = Triprel.objects.create(trip_name="Legacy")
+        self.budget = [Budget.objects.create(trip=self.trip, label=f"Item {i}", expense=10, category="Food",
+                                             location="Rome", date=datetime.date(2024, 1, 1)) for i in range(4)]
+        self.person = People.objects.create(trip=self.trip, name="Ann", contact="-",
+                                            met_location="Rome", met_date=datetime.date(2024, 1, 1))
+        self.memory = Memories.objects.create(trip=self.trip, memory_photo="memories/0.jpg", caption="Tower",
+                                              location="Rome", date="2024-01-01")
+        rebuild_rollup()
+
+    def write_names(self, table, id_column, column, names):
+        # As left by the migration from the free-text columns, bypassing the foreign key
+        with connection.cursor() as cursor:
+            for row_id, name in names.items():
+                cursor.execute(f"UPDATE {table} SET {column} = %s WHERE {id_column} = %s", [name, row_id])
+
+    def test_legacy_names_are_merged_into_lookup_rows(self):
+        self.assertFalse(Location.objects.filter(pk=42).exists())
+        self.write_names("api_budget", "budget_id", "location_id", {
+            self.budget[0].pk: "Paris", self.budget[1].pk: "paris ", self.budget[2].pk: "Paris", self.budget[3].pk: "42"})
+        self.write_names("api_people", "person_id", "met_location_id", {self.person.pk: "PARIS"})
+        self.write_names("api_memories", "memory_id", "location_id", {self.memory.pk: "42"})
+
+        ensure_lookups(sender=None)
+
+        paris = Location.objects.get(key="paris")
+        self.assertEqual(paris.name, "Paris")
+        self.assertEqual(Location.objects.get(key="42").name, "42")
+        locations = lambda queryset, field: list(queryset.order_by("pk").values_list(field, flat=True))
+        self.assertEqual(locations(Budget.objects.all(), "location__name"), ["Paris", "Paris", "Paris", "42"])
+        self.assertEqual(locations(People.objects.all(), "met_location__name"), ["Paris"])
+        self.assertEqual(locations(Memories.objects.all(), "location__name"), ["42"])
+        self.assertEqual(rollup_mismatches(), [])
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT kind, location FROM api_search ORDER BY kind, row_id")
+            indexed = cursor.fetchall()
+        self.assertEqual(indexed, [("budget", "Paris")] * 3 + [("budget", "42"), ("memories", "42"), ("people", "Paris")])
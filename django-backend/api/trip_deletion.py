@@ -0,0 +1,202 @@
+import json
+import threading
+import time
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models.fields.json import KT
+from .jobs import enqueue
+from .models import Job, Triprel, Budget, BudgetRollup, People, PersonPhoto, Memories, MemoryDateQuarantine, ImageRendition
+
+# Trip deletion with set-based statements instead of Django's cascade collector, which loads
+# every child row into Python first. Each child table is emptied for the trip with
+# DELETE ... WHERE pk IN (SELECT ... LIMIT n) chunks inside one transaction, so the work is
+# still atomic but progress can be reported between chunks. The search index follows through
+# its triggers. The photo and rendition files are unlinked by a "remove_media" job queued in the
+# same transaction (see api/jobs.py), so they are removed even if the server restarts first.
+# These statements bypass model signals: callers bump the data version, and the vocabulary
+# and the budget engine are invalidated here.
+#
+# The job row is also the durable record of the deletion: it carries the trip id and the rows
+# deleted per table, so every worker process can report the status, before and after a restart.
+# Chunk progress of the transaction itself is only known to the process running it.
+
+DEFAULTS = {
+    'CHUNK_SIZE': 5000,  # Rows removed per DELETE statement
+}
+
+_lock = threading.Lock()
+_running = {}  # trip_id -> progress of the deletions this process is running
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'TRIP_DELETION', {})}
+
+
+def _table(model):
+    return model._meta.db_table
+
+
+def _pk(model):
+    return model._meta.pk.column
+
+
+def _photo_sources():
+    """SQL selecting the storage names of a trip's person photos and memory photos; takes trip_id twice."""
+    return (f"SELECT photo FROM {_table(PersonPhoto)} WHERE trip_id = %s "
+            f"UNION ALL SELECT memory_photo FROM {_table(Memories)} WHERE trip_id = %s")
+
+
+def _targets():
+    """(model, WHERE clause, trip_id parameter count) per table, children before parents."""
+    return [
+        (MemoryDateQuarantine, f"memory_id IN (SELECT memory_id FROM {_table(Memories)} WHERE trip_id = %s)", 1),
+        (ImageRendition, f"source IN ({_photo_sources()})", 2),
+        (PersonPhoto, "trip_id = %s", 1),
+        (People, "trip_id = %s", 1),
+        (Memories, "trip_id = %s", 1),
+        (Budget, "trip_id = %s", 1),
+        (BudgetRollup, "trip_id = %s", 1),
+        (Triprel, "trip_id = %s", 1),
+    ]
+
+
+def _job_status(job):
+    """Status of a committed deletion from its "remove_media" job values."""
+    state = {"queued": "removing_media", "running": "removing_media", "succeeded": "done"}.get(job["state"], job["state"])
+    media = {"total": job["media_total"], "deleted": 0, "kept": 0, "failed": 0}
+    media.update(job["result"] or job["progress"] or {})
+    finished = job["date_finished"].timestamp() if job["date_finished"] else None
+    return {
+        "trip_id": job["trip_id"],
+        "state": state,  # deleting -> removing_media -> done, or failed/cancelled
+        "started": job["date_created"].timestamp(),
+        "finished": finished,
+        "tables": {table: {"total": deleted, "deleted": deleted} for table, deleted in job["tables"].items()},
+        "media": media,
+        "media_job": job["job_id"],
+        "error": job["error"] or None,
+    }
+
+
+def deletion_status(trip_id):
+    """
+    Return the status of the latest deletion of a trip, or None.
+    A deletion still in its transaction is only visible from the process running it.
+    """
+    with _lock:
+        running = _running.get(trip_id)
+        if running is not None:
+            status = {**running, "tables": {name: dict(counts) for name, counts in running["tables"].items()},
+                      "media": dict(running["media"])}
+
+    if running is None:
+        # The file list in params can be long, so only the small keys are read from it
+        job = (Job.objects.filter(kind="remove_media", params__trip_id=trip_id).order_by("-job_id")
+               .values("job_id", "state", "progress", "result", "error", "date_created", "date_finished",
+                       tables=KT("params__tables"), media_total=KT("params__media_total"))
+               .first())
+        if job is None:
+            return None
+        job["trip_id"] = trip_id
+        job["tables"] = json.loads(job["tables"] or "{}")
+        job["media_total"] = int(job["media_total"] or 0)
+        status = _job_status(job)
+    status["elapsed"] = (status["finished"] or time.time()) - status["started"]
+    return status
+
+
+def _media_names(cursor, trip_id):
+    cursor.execute(_photo_sources(), [trip_id, trip_id])
+    names = {name for name, in cursor.fetchall() if name}
+    cursor.execute(f"SELECT image FROM {_table(ImageRendition)} WHERE source IN ({_photo_sources()})",
+                   [trip_id, trip_id])
+    names.update(name for name, in cursor.fetchall() if name)
+    return sorted(names)
+
+
+def _still_referenced(names):
+    """Names among the given ones that another row references, e.g. after a concurrent upload."""
+    referenced = set()
+    for start in range(0, len(names), 500):
+        batch = names[start:start + 500]
+        for queryset in (PersonPhoto.objects.filter(photo__in=batch).values_list('photo', flat=True),
+                         Memories.objects.filter(memory_photo__in=batch).values_list('memory_photo', flat=True),
+                         ImageRendition.objects.filter(image__in=batch).values_list('image', flat=True)):
+            referenced.update(queryset)
+    return referenced
+
+
+def remove_media_files(names, progress=None, batch_size=500):
+    """
+    Delete the given media files unless a row references them again; the "remove_media" job.
+    progress(summary), when given, is called after each batch. Returns the summary counts.
+    """
+    summary = {"total": len(names), "deleted": 0, "kept": 0, "failed": 0}
+    for start in range(0, len(names), batch_size):
+        batch = names[start:start + batch_size]
+        referenced = _still_referenced(batch)
+        summary["kept"] += len(referenced)
+        for name in batch:
+            if name in referenced:
+                continue
+            try:
+                default_storage.delete(name)
+                summary["deleted"] += 1
+            except OSError as e:
+                print(f"Failed to delete {name}: {e}")
+                summary["failed"] += 1
+        if progress:
+            progress(dict(summary))
+    return summary
+
+
+def delete_trip_rows(trip_id):
+    """
+    Delete a trip and every row that belongs to it in one transaction.
+    Returns ({table: rows deleted}, the queued "remove_media" job), or None when the trip does not exist.
+    The job removes the trip's photo and rendition files after commit; follow deletion_status(trip_id).
+    """
+    from .columnar import invalidate_budget_engine
+    from .vocabulary import invalidate_vocabulary
+
+    chunk_size = _config()['CHUNK_SIZE']
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not Triprel.objects.filter(trip_id=trip_id).exists():
+                return None
+            status = {"trip_id": trip_id, "state": "deleting", "started": time.time(), "finished": None,
+                      "tables": {}, "media": {"total": 0, "deleted": 0, "kept": 0, "failed": 0},
+                      "media_job": None, "error": None}
+            with _lock:
+                _running[trip_id] = status
+
+            for model, where, uses in _targets():
+                cursor.execute(f"SELECT COUNT(*) FROM {_table(model)} WHERE {where}", [trip_id] * uses)
+                status["tables"][_table(model)] = {"total": cursor.fetchone()[0], "deleted": 0}
+            names = _media_names(cursor, trip_id)
+            status["media"]["total"] = len(names)
+
+            for model, where, uses in _targets():
+                table, pk = _table(model), _pk(model)
+                counts = status["tables"][table]
+                while counts["deleted"] < counts["total"]:
+                    cursor.execute(
+                        f"DELETE FROM {table} WHERE {pk} IN (SELECT {pk} FROM {table} WHERE {where} LIMIT %s)",
+                        [trip_id] * uses + [chunk_size])
+                    if not cursor.rowcount:
+                        break
+                    with _lock:
+                        counts["deleted"] += cursor.rowcount
+
+            invalidate_vocabulary()
+            invalidate_budget_engine()
+            deleted = {table: counts["deleted"] for table, counts in status["tables"].items()}
+            # Queued even without files: the job row is the durable record of the deletion
+            job = enqueue("remove_media", {"trip_id": trip_id, "tables": deleted,
+                                           "media_total": len(names), "names": names})
+    finally:
+        with _lock:
+            _running.pop(trip_id, None)
+
+    return deleted, job
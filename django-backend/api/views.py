@@ -1,21 +1,73 @@
 from django.shortcuts import get_object_or_404
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils.timezone import now
+from django.views.decorators.http import require_GET
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .models import Triprel, Budget, People, PersonPhoto, Memories
-from .serializers import TriprelSerializer, BudgetSerializer, PeopleSerializer, PersonPhotoSerializer, MemoriesSerializer
+from rest_framework.utils.encoders import JSONEncoder
+from .models import Triprel, Budget, BudgetRollup, People, PersonPhoto, Memories, Category, Job, canonical_key
+from .serializers import TriprelSerializer, TripStatsSerializer, BudgetSerializer, PeopleSerializer, PersonPhotoSerializer, MemoriesSerializer, JobSerializer
 from rest_framework import status
 from django.utils.dateparse import parse_date
-import os
-from django.conf import settings
-from django.db import connection
-
+import io
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from itertools import islice
+import csv
+import json
+from django.db import connection, transaction
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from .rollup import refresh_rollup, refresh_trip_rollup, rollup_key
+from .cache import cached_response, conditional_response, bump_data_version, cache_stats
+from .concurrency import gather_queries
+from .columnar import budget_engine, engine_filters, invalidate_budget_engine, record_budget_deletes
+from .distribution import describe_expenses, distribution_config
+from .lookups import LOCATION_ID, CATEGORY_ID, LOOKUP_FIELDS, lookup_names, resolve_names
+from .pagination import keyset_page, wants_page
+from .jobs import enqueue, cancel_job
+from .search import search as search_index, SOURCES as SEARCH_SOURCES
+from .vocabulary import suggest, invalidate_vocabulary, record_delete as forget_vocabulary, FIELDS as VOCABULARY_FIELDS, DEFAULT_LIMIT as SUGGEST_LIMIT, MAX_LIMIT as MAX_SUGGEST_LIMIT
+from .ingest import image_upload, ingest_image, rejected_upload, ImageRejected
+from .renditions import schedule_renditions, delete_renditions, rendition_map, rendition_urls
+from .trip_deletion import delete_trip_rows, deletion_status
+
+
+def _per_trip(model, aggregate, output_field):
+    """Correlated subquery computing one aggregate of model's rows for the outer trip, 0 when it has none."""
+    rows = model.objects.filter(trip=OuterRef('pk')).order_by().values('trip')
+    return Coalesce(Subquery(rows.annotate(value=aggregate).values('value')), 0, output_field=output_field)
+
+def _with_trip_stats(trips):
+    """Annotate trips with their total spend and expense, people and memory counts in the same query."""
+    return trips.annotate(
+        total_spend=_per_trip(BudgetRollup, Sum('total'), DecimalField(max_digits=14, decimal_places=2)),
+        expense_count=_per_trip(BudgetRollup, Sum('count'), IntegerField()),
+        people_count=_per_trip(People, Count('pk'), IntegerField()),
+        memory_count=_per_trip(Memories, Count('pk'), IntegerField()),
+    )
 
+@conditional_response
 @api_view(['GET'])
+@cached_response("trips", extra_params=("include_stats", "page_size", "cursor"))
 def get_trips(request):
-    """Fetch all trips from the database."""
-    trips = Triprel.objects.all().order_by('-date_created')
-    serializer = TriprelSerializer(trips, many=True)
+    """
+    Fetch all trips from the database. Send page_size/cursor for keyset pagination.
+    Send include_stats=true to add each trip's total spend and expense, people and memory counts.
+    """
+    trips = Triprel.objects.all()
+    serializer_class = TriprelSerializer
+    if request.GET.get("include_stats") in ("1", "true", "True"):
+        trips = _with_trip_stats(trips)
+        serializer_class = TripStatsSerializer
+
+    if wants_page(request):
+        return keyset_page(request, trips, 'date_created', 'trip_id', serializer_class)
+
+    serializer = serializer_class(trips.order_by('-date_created'), many=True)
     return Response(serializer.data)
 
 
@@ -32,9 +84,11 @@ def add_trip(request):
     if not created:
         return Response({'error': 'Trip already exists'}, status=400)
 
+    bump_data_version(trip.trip_id)
     return Response({'message': 'Trip added successfully', 'trip_id': trip.trip_id})
 
 
+@conditional_response
 @api_view(['GET'])
 def get_trip_details(request, trip_id):
     """Fetch trip details if it exists"""
@@ -42,6 +96,47 @@ def get_trip_details(request, trip_id):
     serializer = TriprelSerializer(trip)
     return Response(serializer.data)
 
+@conditional_response
+@api_view(['GET'])
+def get_trip_bundle(request, trip_id):
+    """
+    Fetch a trip with its budget, people (each with their latest photo) and memories in one response.
+    Uses a fixed number of queries regardless of how many rows the trip has.
+    """
+    trip = get_object_or_404(Triprel, trip_id=trip_id)
+
+    budget_items = Budget.objects.filter(trip=trip).order_by('-date')
+    people_items = People.objects.filter(trip=trip).prefetch_related(
+        Prefetch('personphoto_set',
+                 queryset=PersonPhoto.objects.filter(trip=trip).order_by('-photo_id'),
+                 to_attr='trip_photos'))
+    memories = Memories.objects.filter(trip=trip)
+
+    memories = list(memories)
+    latest_photos = {person.person_id: person.trip_photos[0]
+                     for person in people_items if person.trip_photos}
+    urls = rendition_urls([photo.photo.name for photo in latest_photos.values()] +
+                          [memory.memory_photo.name for memory in memories])
+
+    people = []
+    for person in people_items:
+        data = PeopleSerializer(person).data
+        latest = latest_photos.get(person.person_id)
+        data["photo"] = PersonPhotoSerializer(latest).data["photo"] if latest else None
+        data["photo_renditions"] = urls.get(latest.photo.name, {}) if latest else {}
+        people.append(data)
+
+    memory_data = MemoriesSerializer(memories, many=True).data
+    for memory, item in zip(memories, memory_data):
+        item["renditions"] = urls.get(memory.memory_photo.name, {})
+
+    return Response({
+        "trip": TriprelSerializer(trip).data,
+        "budget": BudgetSerializer(budget_items, many=True).data,
+        "people": people,
+        "memories": memory_data
+    })
+
 @api_view(['PUT'])
 def edit_trip(request, trip_id):
     """Edit the trip name if it exists and the new name is valid"""
@@ -60,80 +155,174 @@ def edit_trip(request, trip_id):
     trip.trip_name = new_trip_name
     trip.save()
 
+    bump_data_version(trip_id)
     return Response({'message': 'Trip updated successfully', 'trip_id': trip.trip_id})
 
 
 @api_view(['DELETE'])
 def delete_trip(request, trip_id):
-    """Delete a trip and all related data"""
-    trip = Triprel.objects.filter(trip_id=trip_id).first()
-    if not trip:
+    """
+    Delete a trip and all related data with one set-based DELETE per table.
+    The photo files are removed in the background; poll trip/<id>/delete/status/ for progress.
+    """
+    outcome = delete_trip_rows(trip_id)
+    if outcome is None:
         return Response({'error': 'Trip not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-    # Delete the trip and all related records
-    trip.delete()
-    
-    return Response({'message': 'Trip deleted successfully.'}, status=status.HTTP_200_OK)
+    deleted, job = outcome
+    bump_data_version(trip_id)
+    return Response({'message': 'Trip deleted successfully.', 'deleted': deleted,
+                     'media_files': job.params['media_total'], 'job_id': job.job_id}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def get_trip_deletion_status(request, trip_id):
+    """Report the progress of the latest deletion of a trip, including its background file removal"""
+    deletion = deletion_status(trip_id)
+    if deletion is None:
+        return Response({'error': 'No deletion recorded for this trip.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(deletion)
 
 
 
+@conditional_response
 @api_view(['GET'])
 def get_budget_items(request, trip_id):
-    """Check if Budget table exists and return budget items for a trip"""
-    budget_items = Budget.objects.filter(trip_id=trip_id).order_by('-date')
+    """
+    Return budget items for a trip.
+    Send page_size/cursor for keyset pagination ordered by (-date, budget_id).
+    """
+    budget_items = Budget.objects.filter(trip_id=trip_id)
+
+    if wants_page(request):
+        return keyset_page(request, budget_items, 'date', 'budget_id', BudgetSerializer)
 
-    if not budget_items.exists():
+    # Serialize first and check the result, instead of a separate exists() query
+    data = BudgetSerializer(budget_items.order_by('-date'), many=True).data
+    if not data:
         return Response({'message': 'No budget entries found for this trip.'}, status=404)
 
-    serializer = BudgetSerializer(budget_items, many=True)
-    return Response(serializer.data)
+    return Response(data)
 
 
-@api_view(['POST'])
-def add_budget_item(request, trip_id):
-    """Add an expense to the Budget table, ensuring all fields are valid"""
+def _parse_expense(value):
+    """
+    Parse an expense into a Decimal that fits Budget.expense.
+    Returns (expense, None) or (None, error message); raises InvalidOperation for non-numbers.
+    """
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise TypeError(value)
+    expense = Decimal(str(value).strip())
+    if not expense.is_finite():
+        raise InvalidOperation(value)
+    # Rounded to the column's decimal places, as the database would store it
+    field = Budget._meta.get_field("expense")
+    limit = Decimal(10) ** (field.max_digits - field.decimal_places)
+    if expense < limit:
+        expense = expense.quantize(Decimal(1).scaleb(-field.decimal_places))
+    if expense >= limit:
+        return None, f"Expense must be less than {limit}."
+    if expense <= 0:
+        return None, "Expense must be greater than zero."
+    return expense, None
+
+
+def _validate_budget_fields(data, partial=False):
+    """
+    Validate the fields of one expense.
+    With partial=True only the fields present in data are checked (used for batch patches).
+    Returns (fields, None) on success or (None, error message) on failure.
+    """
+    names = ("label", "expense", "category", "location", "date")
+    if partial:
+        names = [name for name in names if name in data]
+        if not names:
+            return None, "No fields to update."
 
-    # Extract data from request
-    label = request.data.get("label", "").strip()
-    expense = request.data.get("expense", "")
-    category = request.data.get("category", "").strip()
-    location = request.data.get("location", "").strip()
-    date_str = request.data.get("date", "").strip()
+    # Text fields must be strings, not lists or objects that would be stored stringified
+    for name in names:
+        if name != "expense" and data.get(name) is not None and not isinstance(data.get(name), str):
+            return None, f"{name.capitalize()} must be text."
+
+    # Extract data
+    fields = {name: data.get(name, "") if name == "expense" else (data.get(name) or "").strip()
+              for name in names}
 
     # Validate all fields
-    if not (label and expense and category and location and date_str):
-        return Response({"error": "All fields are required."}, status=status.HTTP_400_BAD_REQUEST)
+    if not all(fields.values()):
+        return None, "All fields are required."
 
-    try:
-        expense = float(expense)
-        if expense <= 0:
-            return Response({"error": "Expense must be greater than zero."}, status=status.HTTP_400_BAD_REQUEST)
-    except ValueError:
-        return Response({"error": "Expense must be a valid number."}, status=status.HTTP_400_BAD_REQUEST)
+    if "expense" in fields:
+        error = None
+        try:
+            fields["expense"], error = _parse_expense(fields["expense"])
+        except (InvalidOperation, TypeError, ValueError):
+            return None, "Expense must be a valid number."
+        if error:
+            return None, error
 
     # Parse date
-    try:
-        date = parse_date(date_str)
-        if not date:
-            raise ValueError
-    except ValueError:
-        return Response({"error": "Invalid date format."}, status=status.HTTP_400_BAD_REQUEST)
+    if "date" in fields:
+        try:
+            fields["date"] = parse_date(fields["date"])
+            if not fields["date"]:
+                raise ValueError
+        except ValueError:
+            return None, "Invalid date format."
+
+    return fields, None
+
+
+def _validate_people_fields(data, partial=False):
+    """
+    Validate the fields of one person.
+    With partial=True only the fields present in data are checked (used for batch patches).
+    Returns (fields, None) on success or (None, error message) on failure.
+    """
+    names = ("name", "contact", "met_location", "met_date")
+    if partial:
+        names = [name for name in names if name in data]
+        if not names:
+            return None, "No fields to update."
+
+    # Extract data
+    fields = {name: str(data.get(name) or "").strip() for name in names}
+
+    # Validate all fields
+    if not all(fields.values()):
+        return None, "All fields are required."
+
+    # Parse date
+    if "met_date" in fields:
+        try:
+            fields["met_date"] = parse_date(fields["met_date"])
+            if not fields["met_date"]:
+                raise ValueError
+        except ValueError:
+            return None, "Invalid date format."
+
+    return fields, None
+
+
+@api_view(['POST'])
+def add_budget_item(request, trip_id):
+    """Add an expense to the Budget table, ensuring all fields are valid"""
+
+    fields, error = _validate_budget_fields(request.data)
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
 
     # Ensure the trip exists
     trip = Triprel.objects.filter(trip_id=trip_id).first()
     if not trip:
         return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
 
-    # Create and save budget item
-    budget_item = Budget.objects.create(
-        trip=trip,
-        label=label,
-        expense=expense,
-        category=category,
-        location=location,
-        date=date
-    )
+    # Create and save budget item, keeping the report rollup in step
+    with transaction.atomic():
+        budget_item = Budget.objects.create(trip=trip, **fields)
+        refresh_rollup([rollup_key(budget_item)])
 
+    bump_data_version(trip_id)
     return Response({"message": "Expense added successfully", "budget_id": budget_item.budget_id}, status=status.HTTP_201_CREATED)
 
 
@@ -172,14 +361,18 @@ def update_budget_item(request, trip_id, budget_id):
         if not date:
             return Response({"error": "Invalid date format."}, status=400)
 
-        # Update fields
+        # Update fields and refresh both the old and new rollup groups
+        old_key = rollup_key(budget_item)
         budget_item.label = label
         budget_item.expense = expense
         budget_item.category = category
         budget_item.location = location
         budget_item.date = date
-        budget_item.save()
+        with transaction.atomic():
+            budget_item.save()
+            refresh_rollup([old_key, rollup_key(budget_item)])
 
+        bump_data_version(trip_id)
         return Response({"message": "Expense updated successfully"}, status=200)
 
     except Exception as e:
@@ -198,8 +391,13 @@ def delete_budget_item(request, trip_id, budget_id):
         if not budget_item:
             return Response({"error": "Budget item not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        # Delete the item
-        budget_item.delete()
+        # Delete the item and its share of the rollup
+        with transaction.atomic():
+            budget_item.delete()
+            refresh_rollup([rollup_key(budget_item)])
+            forget_vocabulary(budget_item)
+            record_budget_deletes([budget_id])
+        bump_data_version(trip_id)
         return Response({"message": "Expense deleted successfully."}, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -207,27 +405,116 @@ def delete_budget_item(request, trip_id, budget_id):
         return Response({"error": "Internal server error", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['POST'])
-def add_people_item(request, trip_id):
-    """Add a person to the People table, ensuring all fields are valid"""
+def _iter_import_rows(upload, file_format):
+    """
+    Yield (row_number, row_dict or None, error) from an uploaded CSV or NDJSON file.
+    The file is decoded line by line so large uploads are never read into memory at once.
+    """
+    stream = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    try:
+        if file_format == "csv":
+            for row_number, row in enumerate(csv.DictReader(stream), start=1):
+                yield row_number, row, None
+        else:
+            row_number = 0
+            for line in stream:
+                if not line.strip():
+                    continue
+                row_number += 1
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield row_number, None, "Invalid JSON."
+                    continue
+                if not isinstance(row, dict):
+                    yield row_number, None, "Each line must be a JSON object."
+                    continue
+                yield row_number, row, None
+    finally:
+        stream.detach()
 
-    # Extract data from request
-    name = request.data.get("name", "").strip()
-    contact = request.data.get("contact", "").strip()
-    met_location = request.data.get("met_location", "").strip()
-    met_date_str = request.data.get("met_date", "").strip()
 
-    # Validate all fields
-    if not (name and contact and met_location and met_date_str):
-        return Response({"error": "All fields are required."}, status=status.HTTP_400_BAD_REQUEST)
+@api_view(['POST'])
+def import_budget_items(request, trip_id):
+    """
+    Import expenses into a trip from an uploaded CSV or NDJSON file.
+    Rows are validated like add_budget_item and inserted with batched bulk_create in one transaction.
+    Invalid rows are skipped and reported; dry_run=true only validates.
+    """
+    upload = request.FILES.get("file", None)
+    if not upload:
+        return Response({"error": "File is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Parse date
+    file_format = str(request.data.get("format", "")).strip().lower()
+    if not file_format:
+        file_format = "csv" if upload.name.lower().endswith(".csv") else "ndjson"
+    if file_format not in ("csv", "ndjson"):
+        return Response({"error": "Format must be csv or ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+    dry_run = str(request.data.get("dry_run", "")).lower() in ("1", "true")
     try:
-        met_date = parse_date(met_date_str)
-        if not met_date:
-            raise ValueError
+        batch_size = max(1, int(request.data.get("batch_size", 500)))
     except ValueError:
-        return Response({"error": "Invalid date format."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"error": "Batch size must be a valid number."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Ensure the trip exists (looked up once for the whole file)
+    trip = Triprel.objects.filter(trip_id=trip_id).first()
+    if not trip:
+        return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    valid = 0
+    errors = []
+    batch = []
+    lookups = {}  # Location/Category rows by name, resolved once per file
+
+    try:
+        with transaction.atomic():
+            for row_number, row, error in _iter_import_rows(upload, file_format):
+                if not error:
+                    fields, error = _validate_budget_fields(row)
+                if error:
+                    errors.append({"row": row_number, "error": error})
+                    continue
+
+                valid += 1
+                if dry_run:
+                    continue
+                batch.append(Budget(trip=trip, **resolve_names(fields, lookups)))
+                if len(batch) >= batch_size:
+                    Budget.objects.bulk_create(batch)
+                    batch = []
+
+            if batch:
+                Budget.objects.bulk_create(batch)
+            if valid and not dry_run:
+                refresh_trip_rollup(trip.trip_id)
+                invalidate_vocabulary()
+                invalidate_budget_engine()
+    except UnicodeDecodeError:
+        return Response({"error": "File must be UTF-8 encoded."}, status=status.HTTP_400_BAD_REQUEST)
+    except csv.Error as e:
+        return Response({"error": f"Invalid CSV: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if valid and not dry_run:
+        bump_data_version(trip_id)
+
+    return Response({
+        "message": "Dry run complete" if dry_run else "Import complete",
+        "dry_run": dry_run,
+        "valid": valid,
+        "imported": 0 if dry_run else valid,
+        "failed": len(errors),
+        "errors": errors
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+def add_people_item(request, trip_id):
+    """Add a person to the People table, ensuring all fields are valid"""
+
+    fields, error = _validate_people_fields(request.data)
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
 
     # Ensure the trip exists
     trip = Triprel.objects.filter(trip_id=trip_id).first()
@@ -235,20 +522,16 @@ def add_people_item(request, trip_id):
         return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
 
     # Create and save people item
-    people_item = People.objects.create(
-        trip=trip,
-        name=name,
-        contact=contact,
-        met_location=met_location,
-        met_date=met_date
-    )
+    people_item = People.objects.create(trip=trip, **fields)
 
+    bump_data_version(trip_id)
     return Response({"message": "Person added successfully", "person_id": people_item.person_id}, status=status.HTTP_201_CREATED)
 
 
+@conditional_response
 @api_view(['GET'])
 def get_people_items(request, trip_id):
-    """Fetch all people for a trip, ensuring the trip exists"""
+    """Fetch all people for a trip, ensuring the trip exists. Send page_size/cursor for keyset pagination."""
 
     # Ensure the trip exists
     trip = Triprel.objects.filter(trip_id=trip_id).first()
@@ -257,11 +540,14 @@ def get_people_items(request, trip_id):
 
     # Fetch people
     people_items = People.objects.filter(trip=trip)
+    if wants_page(request):
+        return keyset_page(request, people_items, 'met_date', 'person_id', PeopleSerializer)
 
     serializer = PeopleSerializer(people_items, many=True)
     return Response(serializer.data)
 
 
+@image_upload
 @api_view(['POST'])
 def add_person_photo(request, person_id):
     """Add a photo for a person, ensuring the person exists"""
@@ -269,6 +555,9 @@ def add_person_photo(request, person_id):
     # Extract data from request
     photo = request.FILES.get("photo", None)
 
+    error = rejected_upload(request, "photo")
+    if error:
+        return Response({"error": error}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
     if not photo:
         return Response({"error": "Photo is required."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -277,12 +566,18 @@ def add_person_photo(request, person_id):
     if not person:
         return Response({"error": "Person not found."}, status=status.HTTP_404_NOT_FOUND)
 
+    try:
+        photo_name = ingest_image(photo, PersonPhoto, "photo")
+    except ImageRejected as e:
+        return Response({"error": str(e)}, status=e.status_code)
+
     # Create and save person photo
     person_photo = PersonPhoto.objects.create(
         person=person,
-        photo=photo
+        photo=photo_name
     )
 
+    bump_data_version(person.trip_id)
     return Response({"message": "Photo added successfully", "photo_id": person_photo.photo_id}, status=status.HTTP_201_CREATED)
 
 
@@ -334,6 +629,7 @@ def update_people_item(request, trip_id, person_id):
         person.met_date = met_date
         person.save()
 
+        bump_data_version(trip_id)
         return Response({"message": "Person updated successfully"}, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -353,7 +649,10 @@ def delete_people_item(request, trip_id, person_id):
             return Response({"error": "Person not found."}, status=status.HTTP_404_NOT_FOUND)
 
         # Delete the item
-        person.delete()
+        with transaction.atomic():
+            person.delete()
+            forget_vocabulary(person)
+        bump_data_version(trip_id)
         return Response({"message": "Person deleted successfully."}, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -379,15 +678,20 @@ def get_person_photo(request, trip_id, person_id):
     if not person_photo:
         return Response({"message": "No photo found for this person."}, status=status.HTTP_404_NOT_FOUND)
 
-    serializer = PersonPhotoSerializer(person_photo)
-    return Response(serializer.data)
+    data = PersonPhotoSerializer(person_photo).data
+    data["renditions"] = rendition_urls([person_photo.photo.name]).get(person_photo.photo.name, {})
+    return Response(data)
 
 
+@image_upload
 @api_view(['POST'])
 def add_or_update_person_photo(request, trip_id, person_id):
     """Add or update a person's photo, ensuring the person exists in the trip"""
 
     photo = request.FILES.get("photo", None)
+    error = rejected_upload(request, "photo")
+    if error:
+        return Response({"error": error}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
     if not photo:
         return Response({"error": "Photo is required."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -401,17 +705,28 @@ def add_or_update_person_photo(request, trip_id, person_id):
     if not person:
         return Response({"error": "Person not found in this trip."}, status=status.HTTP_404_NOT_FOUND)
 
+    try:
+        photo = ingest_image(photo, PersonPhoto, "photo")
+    except ImageRejected as e:
+        return Response({"error": str(e)}, status=e.status_code)
+
     # Check if a photo already exists for this person in this trip
     person_photo = PersonPhoto.objects.filter(person=person, trip=trip).first()
 
     if person_photo:
+        old_photo = person_photo.photo.name
         person_photo.photo = photo
         person_photo.save()
+        delete_renditions([old_photo])
+        schedule_renditions(person_photo.photo.name, trip_id)
+        bump_data_version(trip_id)
         return Response({"message": "Photo updated successfully", "photo_id": person_photo.photo_id}, status=status.HTTP_200_OK)
 
     else:
         new_photo = PersonPhoto.objects.create(
             person=person, trip=trip, photo=photo)
+        schedule_renditions(new_photo.photo.name, trip_id)
+        bump_data_version(trip_id)
         return Response({"message": "Photo added successfully", "photo_id": new_photo.photo_id}, status=status.HTTP_201_CREATED)
 
 
@@ -431,95 +746,71 @@ def delete_person_photo(request, trip_id, person_id):
         return Response({"error": "No photo found for this person."}, status=status.HTTP_404_NOT_FOUND)
 
     person_photo.delete()
+    delete_renditions([person_photo.photo.name])
+    bump_data_version(trip_id)
     return Response({"message": "Photo deleted successfully."}, status=status.HTTP_200_OK)
 
 
 @api_view(['DELETE'])
 def cleanup_unused_images(request):
-    """Delete images from storage that are not in the PersonPhoto table."""
+    """
+    Queue the removal of media files that no PersonPhoto, Memories or ImageRendition row references.
+    Covers every media subdirectory; pass dry_run=true to only report what would be removed.
+    Returns the job, whose summary appears at jobs/<id>/ once it succeeds; a cleanup already queued is reused.
+    """
+    dry_run = request.GET.get("dry_run", "").lower() in ("1", "true")
+    job = enqueue("cleanup_media", {"dry_run": dry_run}, unique=True)
 
-    # ✅ Step 1: Get all file paths from the database (safe with prepared statement)
-    with connection.cursor() as cursor:
-        # Adjust table name if needed
-        cursor.execute("SELECT photo FROM api_personphoto")
-        db_image_paths = {row[0]
-                          for row in cursor.fetchall()}  # Set for fast lookup
-
-    # ✅ Step 2: Get all image file paths from the filesystem
-    image_dir = os.path.join(settings.MEDIA_ROOT, "images")
-    if not os.path.exists(image_dir):
-        return Response({"message": "No images directory found."}, status=404)
-
-    folder_images = {f"/media/images/{file}" for file in os.listdir(
-        image_dir) if file.endswith(('.jpg', '.png', '.jpeg'))}
-
-    # ✅ Step 3: Find and delete images that are NOT in the database
-    unused_images = []
-    db_image_names = [str(image_path.split('/')[-1])
-                      for image_path in db_image_paths]
-    for image_path in folder_images:
-        image_name = str(image_path.split('/')[-1])
-        if image_name not in db_image_names:
-            unused_images.append(image_path)
-    deleted_files = []
-
-    for unused_image in unused_images:
-        file_path = os.path.join(
-            settings.MEDIA_ROOT, unused_image.replace('/media/', ''))
-        try:
-            os.remove(file_path)
-            deleted_files.append(unused_image)
-        except Exception as e:
-            print(f"Failed to delete {unused_image}: {e}")
+    return Response({"message": "Cleanup queued", **JobSerializer(job).data}, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+def get_job(request, job_id):
+    """Fetch the state, progress and result of a background job"""
+    job = Job.objects.filter(job_id=job_id).first()
+    if job is None:
+        return Response({"error": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(JobSerializer(job).data)
 
-    with connection.cursor() as cursor:
-        # Adjust table name if needed
-        cursor.execute("SELECT memory_photo FROM api_memories")
-        db_memory_paths = {row[0]
-                           for row in cursor.fetchall()}
-
-    memory_dir = os.path.join(settings.MEDIA_ROOT, "memories")
-    if not os.path.exists(memory_dir):
-        return Response({"message": "No memories directory found."}, status=404)
-
-    folder_memories = {f"/media/memories/{file}" for file in os.listdir(
-        memory_dir) if file.endswith(('.jpg', '.png', '.jpeg'))}
-
-    unused_memories = []
-    db_memory_names = [str(memory_path.split('/')[-1])
-                       for memory_path in db_memory_paths]
-    for memory_path in folder_memories:
-        memory_name = str(memory_path.split('/')[-1])
-        if memory_name not in db_memory_names:
-            unused_memories.append(memory_path)
-
-    deleted_memories = []
-    for unused_memory in unused_memories:
-        file_path = os.path.join(
-            settings.MEDIA_ROOT, unused_memory.replace('/media/', ''))
-        try:
-            os.remove(file_path)
-            deleted_memories.append(unused_memory)
-        except Exception as e:
-            print(f"Failed to delete {unused_memory}: {e}")
 
-    return Response({"message": "Cleanup complete", "deleted": deleted_files, "unused": unused_images, "db_path": db_image_paths, "unused memories": unused_memories, "deleted memories": deleted_memories}, status=200)
+@api_view(['POST'])
+def cancel_background_job(request, job_id):
+    """Cancel a queued job, or ask a running one to stop at its next progress report"""
+    job = cancel_job(job_id)
+    if job is None:
+        return Response({"error": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(JobSerializer(job).data)
+
 
+def _attach_memory_renditions(memories, data):
+    """Add the rendition URLs of each memory photo to its serialized data (one query)."""
+    urls = rendition_urls(memory.memory_photo.name for memory in memories)
+    for memory, item in zip(memories, data):
+        item["renditions"] = urls.get(memory.memory_photo.name, {})
+    return data
 
+
+@conditional_response
 @api_view(['GET'])
 def get_memories(request, trip_id):
-    """Fetch all memories for a specific trip"""
+    """Fetch all memories for a specific trip. Send page_size/cursor for keyset pagination."""
 
     trip = Triprel.objects.filter(trip_id=trip_id).first()
     if not trip:
         return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
 
     memories = Memories.objects.filter(trip=trip)
-    serializer = MemoriesSerializer(memories, many=True)
+    if wants_page(request):
+        return keyset_page(request, memories, 'date', 'memory_id', MemoriesSerializer,
+                           decorate=_attach_memory_renditions)
 
-    return Response(serializer.data)
+    memories = list(memories)
+    data = MemoriesSerializer(memories, many=True).data
 
+    return Response(_attach_memory_renditions(memories, data))
 
+
+@image_upload
 @api_view(['POST'])
 def add_memory(request, trip_id):
     """Add a memory to a trip with a photo, caption, location, and date."""
@@ -528,28 +819,47 @@ def add_memory(request, trip_id):
     photo = request.FILES.get("memory_photo", None)
     caption = request.data.get("caption", "").strip()
     location = request.data.get("location", "").strip()
-    date = request.data.get("date", "").strip()  # Date as string
+    date_str = request.data.get("date", "").strip()
 
-    if not photo or not caption or not location or not date:
+    error = rejected_upload(request, "memory_photo")
+    if error:
+        return Response({"error": error}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    if not photo or not caption or not location or not date_str:
         return Response({"error": "All fields (photo, caption, location, date) are required."}, status=status.HTTP_400_BAD_REQUEST)
 
+    # Parse date
+    try:
+        date = parse_date(date_str)
+        if not date:
+            raise ValueError
+    except ValueError:
+        return Response({"error": "Invalid date format."}, status=status.HTTP_400_BAD_REQUEST)
+
     # Ensure the trip exists
     trip = Triprel.objects.filter(trip_id=trip_id).first()
     if not trip:
         return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
 
+    try:
+        photo_name = ingest_image(photo, Memories, "memory_photo")
+    except ImageRejected as e:
+        return Response({"error": str(e)}, status=e.status_code)
+
     # Create and save memory
     memory = Memories.objects.create(
         trip=trip,
-        memory_photo=photo,
+        memory_photo=photo_name,
         caption=caption,
         location=location,
         date=date
     )
+    schedule_renditions(memory.memory_photo.name, trip_id)
 
+    bump_data_version(trip_id)
     return Response({"message": "Memory added successfully", "memory_id": memory.memory_id}, status=status.HTTP_201_CREATED)
 
 
+@image_upload
 @api_view(['PUT'])
 def edit_memory(request, trip_id, memory_id):
     """Edit an existing memory's photo, caption, location, or date."""
@@ -563,9 +873,23 @@ def edit_memory(request, trip_id, memory_id):
     # Extract data
     caption = request.data.get("caption", "").strip()
     location = request.data.get("location", "").strip()
-    date = request.data.get("date", "").strip()  # Keep as string
+    date_str = request.data.get("date", "").strip()
     photo = request.FILES.get("memory_photo", None)
 
+    error = rejected_upload(request, "memory_photo")
+    if error:
+        return Response({"error": error}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    # Parse date if one was sent
+    date = None
+    if date_str:
+        try:
+            date = parse_date(date_str)
+            if not date:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "Invalid date format."}, status=status.HTTP_400_BAD_REQUEST)
+
     if caption:
         memory.caption = caption
 
@@ -573,13 +897,22 @@ def edit_memory(request, trip_id, memory_id):
         memory.location = location
 
     if date:
-        memory.date = date  # No need to convert
+        memory.date = date
 
+    old_photo = memory.memory_photo.name
     if photo:
-        memory.memory_photo = photo  # Replace the existing photo
+        try:
+            memory.memory_photo = ingest_image(photo, Memories, "memory_photo")  # Replace the existing photo
+        except ImageRejected as e:
+            return Response({"error": str(e)}, status=e.status_code)
 
     memory.save()
 
+    if photo:
+        delete_renditions([old_photo])
+        schedule_renditions(memory.memory_photo.name, trip_id)
+
+    bump_data_version(trip_id)
     return Response({"message": "Memory updated successfully"}, status=status.HTTP_200_OK)
 
 
@@ -593,27 +926,253 @@ def delete_memory(request, trip_id, memory_id):
     if not memory:
         return Response({"error": "Memory not found."}, status=status.HTTP_404_NOT_FOUND)
 
-    # Delete the photo file
+    # Delete the photo file and its renditions
+    delete_renditions([memory.memory_photo.name])
     memory.memory_photo.delete(save=False)
 
     # Delete the memory record
-    memory.delete()
+    with transaction.atomic():
+        memory.delete()
+        forget_vocabulary(memory)
 
+    bump_data_version(trip_id)
     return Response({"message": "Memory deleted successfully."}, status=status.HTTP_200_OK)
 
+
+def _parse_filter_date(value):
+    """Parse a YYYY-MM-DD filter value; None when it is not a valid date."""
+    try:
+        return parse_date(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _batch_target(queryset, pk_name, data, filter_fields):
+    """
+    Narrow a trip's queryset to the rows a batch request targets.
+    The body carries either "ids" (a list of primary keys) or "filter" (location/category/start_date/end_date).
+    filter_fields maps those filter names to the model's columns.
+    Returns (queryset, requested ids or None, error message or None).
+    """
+    ids = data.get("ids", None)
+    filters = data.get("filter", None)
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return None, None, "Ids must be a list of integers."
+        return queryset.filter(**{f"{pk_name}__in": ids}), ids, None
+
+    if not isinstance(filters, dict) or not filters:
+        return None, None, "Provide a list of ids or a filter."
+
+    for key, value in filters.items():
+        if key in ("start_date", "end_date") and "date" in filter_fields:
+            continue
+        if key not in filter_fields:
+            return None, None, f"Unsupported filter: {key}."
+        if queryset.model._meta.get_field(filter_fields[key]).is_relation:
+            # Location/Category lookups match names folded for case and whitespace
+            queryset = queryset.filter(**{f"{filter_fields[key]}__key": canonical_key(value)})
+        elif key == "date":
+            date = _parse_filter_date(value)
+            if date is None:
+                return None, None, "Invalid date format."
+            queryset = queryset.filter(**{filter_fields[key]: date})
+        else:
+            queryset = queryset.filter(**{filter_fields[key]: str(value).strip()})
+
+    start_date = filters.get("start_date")
+    end_date = filters.get("end_date")
+    if start_date or end_date:
+        if not (start_date and end_date):
+            return None, None, "Both start_date and end_date are required."
+        start_date, end_date = _parse_filter_date(start_date), _parse_filter_date(end_date)
+        if start_date is None or end_date is None:
+            return None, None, "Invalid date format."
+        queryset = queryset.filter(**{f"{filter_fields['date']}__range": (start_date, end_date)})
+
+    return queryset, None, None
+
+
+@api_view(['PUT'])
+def batch_update_budget_items(request, trip_id):
+    """Apply one field patch to many budget items with a single UPDATE"""
+
+    patch = request.data.get("patch", None)
+    if not isinstance(patch, dict):
+        return Response({"error": "Patch must be an object of fields."}, status=status.HTTP_400_BAD_REQUEST)
+
+    fields, error = _validate_budget_fields(patch, partial=True)
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not Triprel.objects.filter(trip_id=trip_id).exists():
+        return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    budget_items, ids, error = _batch_target(
+        Budget.objects.filter(trip_id=trip_id), "budget_id", request.data,
+        {"location": "location", "category": "category", "date": "date"})
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        found = set(budget_items.values_list("budget_id", flat=True)) if ids is not None else set()
+        affected = budget_items.update(**resolve_names(fields))
+        if affected:
+            refresh_trip_rollup(trip_id)
+            invalidate_vocabulary()
+            invalidate_budget_engine()
+
+    if affected:
+        bump_data_version(trip_id)
+    failed_ids = [i for i in ids if i not in found] if ids is not None else []
+    return Response({"message": "Expenses updated successfully", "affected": affected, "failed_ids": failed_ids}, status=status.HTTP_200_OK)
+
+
+@api_view(['DELETE'])
+def batch_delete_budget_items(request, trip_id):
+    """Delete many budget items with a single DELETE"""
+
+    if not Triprel.objects.filter(trip_id=trip_id).exists():
+        return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    budget_items, ids, error = _batch_target(
+        Budget.objects.filter(trip_id=trip_id), "budget_id", request.data,
+        {"location": "location", "category": "category", "date": "date"})
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        deleted_ids = list(budget_items.values_list("budget_id", flat=True))
+        found = set(deleted_ids)
+        affected, _ = budget_items.delete()
+        if affected:
+            refresh_trip_rollup(trip_id)
+            invalidate_vocabulary()
+            if affected == len(deleted_ids):
+                record_budget_deletes(deleted_ids)
+            else:  # Rows changed between the two statements
+                invalidate_budget_engine()
+
+    if affected:
+        bump_data_version(trip_id)
+    failed_ids = [i for i in ids if i not in found] if ids is not None else []
+    return Response({"message": "Expenses deleted successfully.", "affected": affected, "failed_ids": failed_ids}, status=status.HTTP_200_OK)
+
+
+@api_view(['PUT'])
+def batch_update_people_items(request, trip_id):
+    """Apply one field patch to many people with a single UPDATE"""
+
+    patch = request.data.get("patch", None)
+    if not isinstance(patch, dict):
+        return Response({"error": "Patch must be an object of fields."}, status=status.HTTP_400_BAD_REQUEST)
+
+    fields, error = _validate_people_fields(patch, partial=True)
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not Triprel.objects.filter(trip_id=trip_id).exists():
+        return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    people_items, ids, error = _batch_target(
+        People.objects.filter(trip_id=trip_id), "person_id", request.data,
+        {"location": "met_location", "date": "met_date"})
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        found = set(people_items.values_list("person_id", flat=True)) if ids is not None else set()
+        affected = people_items.update(**resolve_names(fields))
+        if affected and "met_location" in fields:
+            invalidate_vocabulary()
+
+    if affected:
+        bump_data_version(trip_id)
+    failed_ids = [i for i in ids if i not in found] if ids is not None else []
+    return Response({"message": "People updated successfully", "affected": affected, "failed_ids": failed_ids}, status=status.HTTP_200_OK)
+
+
+@api_view(['DELETE'])
+def batch_delete_people_items(request, trip_id):
+    """Delete many people, and their photos, in one transaction"""
+
+    if not Triprel.objects.filter(trip_id=trip_id).exists():
+        return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    people_items, ids, error = _batch_target(
+        People.objects.filter(trip_id=trip_id), "person_id", request.data,
+        {"location": "met_location", "date": "met_date"})
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        found = set(people_items.values_list("person_id", flat=True))
+        person_photos = PersonPhoto.objects.filter(person_id__in=found)
+        delete_renditions(person_photos.values_list("photo", flat=True))
+        person_photos.delete()
+        affected, _ = People.objects.filter(person_id__in=found).delete()
+        if affected:
+            invalidate_vocabulary()
+
+    if affected:
+        bump_data_version(trip_id)
+    failed_ids = [i for i in ids if i not in found] if ids is not None else []
+    return Response({"message": "People deleted successfully.", "affected": affected, "failed_ids": failed_ids}, status=status.HTTP_200_OK)
+
+
+def _delete_media_files(names):
+    """Remove stored media files, ignoring ones that are already gone."""
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError as e:
+            print(f"Failed to delete {name}: {e}")
+
+
+@api_view(['DELETE'])
+def batch_delete_memories(request, trip_id):
+    """Delete many memories in one transaction and remove their images once it commits"""
+
+    if not Triprel.objects.filter(trip_id=trip_id).exists():
+        return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    memories, ids, error = _batch_target(
+        Memories.objects.filter(trip_id=trip_id), "memory_id", request.data,
+        {"location": "location", "date": "date"})
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        rows = list(memories.values_list("memory_id", "memory_photo"))
+        found = {memory_id for memory_id, _ in rows}
+        affected, _ = Memories.objects.filter(memory_id__in=found).delete()
+        if affected:
+            invalidate_vocabulary()
+        photos = [photo for _, photo in rows if photo]
+        delete_renditions(photos)
+        transaction.on_commit(lambda: _delete_media_files(photos))
+
+    if affected:
+        bump_data_version(trip_id)
+    failed_ids = [i for i in ids if i not in found] if ids is not None else []
+    return Response({"message": "Memories deleted successfully.", "affected": affected, "failed_ids": failed_ids}, status=status.HTTP_200_OK)
+
 from django.db import connection
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+@conditional_response
 @api_view(['GET'])
+@cached_response("locations")
 def get_unique_locations(request):
     """
     Return unique non-empty, non-null locations from Budget table using prepared SQL.
     """
     query = """
-        SELECT DISTINCT location FROM api_budget
-        WHERE location IS NOT NULL AND TRIM(location) != ''
-        ORDER BY location ASC
+        SELECT name FROM api_location
+        WHERE location_id IN (SELECT location_id FROM api_budget) AND TRIM(name) != ''
+        ORDER BY name ASC
     """
     with connection.cursor() as cursor:
         cursor.execute(query)
@@ -622,15 +1181,17 @@ def get_unique_locations(request):
 
     return Response(locations, status=200)
 
+@conditional_response
 @api_view(['GET'])
+@cached_response("categories")
 def get_unique_categories(request):
     """
     Return unique non-empty, non-null categories from Budget table using prepared SQL.
     """
     query = """
-        SELECT DISTINCT category FROM api_budget
-        WHERE category IS NOT NULL AND TRIM(category) != ''
-        ORDER BY category ASC
+        SELECT name FROM api_category
+        WHERE category_id IN (SELECT category_id FROM api_budget) AND TRIM(name) != ''
+        ORDER BY name ASC
     """
     with connection.cursor() as cursor:
         cursor.execute(query)
@@ -640,150 +1201,201 @@ def get_unique_categories(request):
     return Response(categories, status=200)
 
 @api_view(['GET'])
-def get_expense_summary(request):
+def autocomplete(request, field):
     """
-    Returns total, average, min, max, count, and last date of expenses based on filters.
+    Suggest locations (from expenses, people and memories) or categories starting with q,
+    most used first. Served from the in-memory vocabulary.
     """
+    if field not in VOCABULARY_FIELDS:
+        return Response({"error": f"Unknown field. Use one of: {', '.join(VOCABULARY_FIELDS)}."}, status=status.HTTP_404_NOT_FOUND)
+
     trip_id = request.GET.get("trip_id")
-    location = request.GET.get("location")
-    category = request.GET.get("category")
-    start_date = request.GET.get("start_date")
-    end_date = request.GET.get("end_date")
+    try:
+        trip_id = int(trip_id) if trip_id else None
+        limit = int(request.GET.get("limit", SUGGEST_LIMIT))
+    except ValueError:
+        return Response({"error": "Trip ID and limit must be valid numbers."}, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(max(limit, 1), MAX_SUGGEST_LIMIT)
 
-    query = """
-        SELECT 
-            SUM(expense) AS total_expense,
-            AVG(expense) AS average_expense,
-            COUNT(*) AS number_of_expenses,
-            MAX(expense) AS max_expense,
-            MIN(expense) AS min_expense,
-            MAX(date) AS last_expense_date
-        FROM api_budget
-        WHERE 1=1
+    return Response(suggest(field, request.GET.get("q", ""), trip_id, limit), status=200)
+
+def _report_response(data, status=200):
     """
-    params = []
+    JSON response of the async report views; keeps .data so the response cache can store it.
+    Encoded like DRF's JSONRenderer (compact separators, no ASCII escaping) so the bodies match the DRF views.
+    """
+    response = JsonResponse(data, encoder=JSONEncoder, safe=False, status=status,
+                            json_dumps_params={"separators": (",", ":"), "ensure_ascii": False})
+    response.data = data
+    return response
 
+def _report_filters(request):
+    """
+    Read the shared report filters from the query string.
+    Returns (trip_id, location, category, start_date, end_date) with blanks as None.
+    """
+    return tuple(
+        request.GET.get(key) or None
+        for key in ("trip_id", "location", "category", "start_date", "end_date")
+    )
+
+def _rollup_filters(query, params, trip_id, location, category, start_date, end_date):
+    """Append the report filters to a query over api_budgetrollup (or api_budget, same columns)."""
     if trip_id:
         query += " AND trip_id = %s"
         params.append(trip_id)
     if location:
-        query += " AND location = %s"
-        params.append(location)
+        query += f" AND location_id = {LOCATION_ID}"
+        params.append(canonical_key(location))
     if category:
-        query += " AND category = %s"
-        params.append(category)
+        query += f" AND category_id = {CATEGORY_ID}"
+        params.append(canonical_key(category))
     if start_date and end_date:
         query += " AND date BETWEEN %s AND %s"
         params.extend([start_date, end_date])
+    return query
+
+def _expense_summary(trip_id, location, category, start_date, end_date):
+    """Total, average, min, max, count and last date of the filtered expenses."""
+    filters = engine_filters(trip_id, location, category, start_date, end_date)
+    if filters is not None:
+        return budget_engine.summary(filters)
+
+    # Read from the rollup: every filter column is part of its key
+    query = """
+        SELECT 
+            SUM(total) AS total_expense,
+            SUM(total) * 1.0 / SUM(count) AS average_expense,
+            SUM(count) AS number_of_expenses,
+            MAX(max_expense) AS max_expense,
+            MIN(min_expense) AS min_expense,
+            MAX(date) AS last_expense_date
+        FROM api_budgetrollup
+        WHERE 1=1
+    """
+    params = []
+    query = _rollup_filters(query, params, trip_id, location, category, start_date, end_date)
 
     with connection.cursor() as cursor:
         cursor.execute(query, params)
         result = cursor.fetchone()
 
-    return Response({
+    return {
         "total_expense": result[0] or 0,
         "average_expense": result[1] or 0,
         "number_of_expenses": result[2] or 0,
         "max_expense": result[3] or 0,
         "min_expense": result[4] or 0,
         "last_date": result[5]
-    })
+    }
 
-@api_view(['GET'])
-def get_category_pie_data(request):
-    """
-    Returns category-wise total expenses (filtered).
-    If user selected a specific category, returns just that slice.
-    """
-    trip_id = request.GET.get("trip_id")
-    location = request.GET.get("location")
-    category = request.GET.get("category")
-    start_date = request.GET.get("start_date")
-    end_date = request.GET.get("end_date")
+def _expense_breakdown(column, trip_id, location, category, start_date, end_date):
+    """Filtered expense totals grouped by category or location, largest first."""
+    filters = engine_filters(trip_id, location, category, start_date, end_date)
+    if filters is not None:
+        return budget_engine.breakdown(column, filters)
 
-    query = """
-        SELECT category, SUM(expense) AS total
-        FROM api_budget
-        WHERE 1=1
-    """
+    # Group by the integer lookup id, then attach the names of the groups
+    query = f"SELECT {column}_id, SUM(total) AS total FROM api_budgetrollup WHERE 1=1"
     params = []
-
-    if trip_id:
-        query += " AND trip_id = %s"
-        params.append(trip_id)
-    if location:
-        query += " AND location = %s"
-        params.append(location)
-    if category:
-        query += " AND category = %s"
-        params.append(category)
-    if start_date and end_date:
-        query += " AND date BETWEEN %s AND %s"
-        params.extend([start_date, end_date])
-
-    query += " GROUP BY category ORDER BY total DESC"
+    query = _rollup_filters(query, params, trip_id, location, category, start_date, end_date)
+    query = f"""
+        SELECT l.name, g.total
+        FROM ({query} GROUP BY {column}_id) g
+        JOIN api_{column} l ON l.{column}_id = g.{column}_id
+        ORDER BY g.total DESC
+    """
 
     with connection.cursor() as cursor:
         cursor.execute(query, params)
         results = cursor.fetchall()
 
-    data = [{"category": row[0], "total": row[1]} for row in results]
-    return Response(data)
+    return [{column: row[0], "total": row[1]} for row in results]
 
-@api_view(['GET'])
-def get_location_pie_data(request):
+@conditional_response
+@require_GET
+@cached_response("summary", response_class=_report_response)
+async def get_expense_summary(request):
     """
-    Returns location-wise total expenses (filtered).
-    If user selected a specific location, returns just that slice.
+    Returns total, average, min, max, count, and last date of expenses based on filters.
     """
-    trip_id = request.GET.get("trip_id")
-    location = request.GET.get("location")
-    category = request.GET.get("category")
-    start_date = request.GET.get("start_date")
-    end_date = request.GET.get("end_date")
+    summary, = await gather_queries(partial(_expense_summary, *_report_filters(request)))
+    return _report_response(summary)
 
-    query = """
-        SELECT location, SUM(expense) AS total
-        FROM api_budget
-        WHERE 1=1
+@conditional_response
+@require_GET
+@cached_response("category-pie", response_class=_report_response)
+async def get_category_pie_data(request):
     """
-    params = []
+    Returns category-wise total expenses (filtered).
+    If user selected a specific category, returns just that slice.
+    """
+    data, = await gather_queries(partial(_expense_breakdown, "category", *_report_filters(request)))
+    return _report_response(data)
 
-    if trip_id:
-        query += " AND trip_id = %s"
-        params.append(trip_id)
-    if location:
-        query += " AND location = %s"
-        params.append(location)
-    if category:
-        query += " AND category = %s"
-        params.append(category)
-    if start_date and end_date:
-        query += " AND date BETWEEN %s AND %s"
-        params.extend([start_date, end_date])
+@conditional_response
+@require_GET
+@cached_response("location-pie", response_class=_report_response)
+async def get_location_pie_data(request):
+    """
+    Returns location-wise total expenses (filtered).
+    If user selected a specific location, returns just that slice.
+    """
+    data, = await gather_queries(partial(_expense_breakdown, "location", *_report_filters(request)))
+    return _report_response(data)
 
-    query += " GROUP BY location ORDER BY total DESC"
+def _expense_distribution(config, trip_id, location, category, start_date, end_date):
+    """Distribution statistics and outliers of the filtered expenses, from one scan of api_budget."""
+    query = "SELECT budget_id, category_id, expense FROM api_budget WHERE 1=1"
+    params = []
+    query = _rollup_filters(query, params, trip_id, location, category, start_date, end_date)
 
     with connection.cursor() as cursor:
         cursor.execute(query, params)
-        results = cursor.fetchall()
-
-    data = [{"location": row[0], "total": row[1]} for row in results]
-    return Response(data)
-
-@api_view(['GET'])
-def get_secondary_summary(request):
-    trip_id = request.GET.get("trip_id")
-    location = request.GET.get("location")
-    category = request.GET.get("category")  # used only for Budget filter
-    start_date = request.GET.get("start_date")
-    end_date = request.GET.get("end_date")
+        rows = cursor.fetchall()
+
+    ids, categories, expenses = zip(*rows) if rows else ((), (), ())
+    data = describe_expenses(ids, categories, expenses, config['BINS'], config['OUTLIER_Z'],
+                             config['MIN_CATEGORY_SIZE'], config['MAX_OUTLIERS'])
+
+    # Categories were grouped by id; only the few flagged rows need their details
+    names = lookup_names(Category, [group["category"] for group in data["categories"]])
+    for group in data["categories"]:
+        group["category"] = names.get(group["category"])
+    data["categories"].sort(key=lambda group: group["category"] or "")
+    details = Budget.objects.in_bulk([outlier["budget_id"] for outlier in data["outliers"]])
+    # A row deleted since the scan is dropped from the outliers
+    data["outliers"] = [outlier for outlier in data["outliers"] if outlier["budget_id"] in details]
+    for outlier in data["outliers"]:
+        item = details[outlier["budget_id"]]
+        outlier.update(trip_id=item.trip_id, label=item.label, category=item.category.name,
+                       location=item.location.name, date=item.date)
+    data["outlier_threshold"] = config['OUTLIER_Z']
+    return data
+
+@conditional_response
+@require_GET
+@cached_response("distribution", extra_params=("bins", "z"), response_class=_report_response)
+async def get_expense_distribution(request):
+    """
+    Returns median, p90/p99, a histogram and per-category outliers of the filtered expenses.
+    Send bins for the number of histogram bins and z for the outlier threshold.
+    """
+    config = distribution_config()
+    try:
+        bins = int(request.GET.get("bins") or config['BINS'])
+        threshold = float(request.GET.get("z") or config['OUTLIER_Z'])
+    except ValueError:
+        return _report_response({"error": "bins must be an integer and z a number."}, status=400)
+    if not 1 <= bins <= config['MAX_BINS'] or not threshold > 0:
+        return _report_response({"error": f"bins must be between 1 and {config['MAX_BINS']} and z positive."}, status=400)
 
-    people_count = 0
-    memory_count = 0
-    location_count = 0
+    config.update(BINS=bins, OUTLIER_Z=threshold)
+    data, = await gather_queries(partial(_expense_distribution, config, *_report_filters(request)))
+    return _report_response(data)
 
-    # --- Count of people met ---
+def _people_count(trip_id, location, start_date, end_date):
+    """Count of people met."""
     people_query = "SELECT COUNT(*) FROM api_people WHERE 1=1"
     people_params = []
 
@@ -791,51 +1403,57 @@ def get_secondary_summary(request):
         people_query += " AND trip_id = %s"
         people_params.append(trip_id)
     if location:
-        people_query += " AND met_location = %s"
-        people_params.append(location)
+        people_query += f" AND met_location_id = {LOCATION_ID}"
+        people_params.append(canonical_key(location))
     if start_date and end_date:
         people_query += " AND met_date BETWEEN %s AND %s"
         people_params.extend([start_date, end_date])
 
     with connection.cursor() as cursor:
         cursor.execute(people_query, people_params)
-        people_count = cursor.fetchone()[0] or 0
+        return cursor.fetchone()[0] or 0
 
-    # --- Count of unique locations visited (Budget table) ---
-    location_query = "SELECT COUNT(DISTINCT location) FROM api_budget WHERE 1=1"
+def _location_count(trip_id, category, start_date, end_date):
+    """
+    Count of distinct locations across budget items, people met and memories.
+    The category filter applies to budget items only; shared by the secondary and full reports.
+    """
+    location_query = "SELECT COUNT(DISTINCT location_id) FROM (SELECT location_id FROM api_budget WHERE 1=1"
     location_params = []
 
     if trip_id:
         location_query += " AND trip_id = %s"
         location_params.append(trip_id)
     if category:
-        location_query += " AND category = %s"
-        location_params.append(category)
+        location_query += f" AND category_id = {CATEGORY_ID}"
+        location_params.append(canonical_key(category))
     if start_date and end_date:
         location_query += " AND date BETWEEN %s AND %s"
         location_params.extend([start_date, end_date])
-    
-    location_query += " UNION SELECT COUNT(DISTINCT met_location) FROM api_people WHERE 1=1"
+
+    location_query += " UNION SELECT met_location_id FROM api_people WHERE 1=1"
     if trip_id:
         location_query += " AND trip_id = %s"
         location_params.append(trip_id)
     if start_date and end_date:
         location_query += " AND met_date BETWEEN %s AND %s"
         location_params.extend([start_date, end_date])
-        
-    location_query += " UNION SELECT COUNT(DISTINCT location) FROM api_memories WHERE 1=1"
+
+    location_query += " UNION SELECT location_id FROM api_memories WHERE 1=1"
     if trip_id:
         location_query += " AND trip_id = %s"
         location_params.append(trip_id)
     if start_date and end_date:
         location_query += " AND date BETWEEN %s AND %s"
         location_params.extend([start_date, end_date])
+    location_query += ")"
 
     with connection.cursor() as cursor:
         cursor.execute(location_query, location_params)
-        location_count = cursor.fetchone()[0] or 0
+        return cursor.fetchone()[0] or 0
 
-    # --- Count of memories (Memories table) ---
+def _memory_count(trip_id, location, start_date, end_date):
+    """Count of memories (Memories table)."""
     memory_query = "SELECT COUNT(*) FROM api_memories WHERE 1=1"
     memory_params = []
 
@@ -843,32 +1461,36 @@ def get_secondary_summary(request):
         memory_query += " AND trip_id = %s"
         memory_params.append(trip_id)
     if location:
-        memory_query += " AND location = %s"
-        memory_params.append(location)
+        memory_query += f" AND location_id = {LOCATION_ID}"
+        memory_params.append(canonical_key(location))
     if start_date and end_date:
         memory_query += " AND date BETWEEN %s AND %s"
         memory_params.extend([start_date, end_date])
 
     with connection.cursor() as cursor:
         cursor.execute(memory_query, memory_params)
-        memory_count = cursor.fetchone()[0] or 0
+        return cursor.fetchone()[0] or 0
+
+@conditional_response
+@require_GET
+@cached_response("secondary-summary", response_class=_report_response)
+async def get_secondary_summary(request):
+    trip_id, location, category, start_date, end_date = _report_filters(request)  # category is used only for Budget
+
+    people_count, location_count, memory_count = await gather_queries(
+        partial(_people_count, trip_id, location, start_date, end_date),
+        partial(_location_count, trip_id, category, start_date, end_date),
+        partial(_memory_count, trip_id, location, start_date, end_date),
+    )
 
-    return Response({
+    return _report_response({
         "people_met": people_count,
         "locations_visited": location_count,
         "memories": memory_count
     })
 
-@api_view(['GET'])
-def get_people_photos_filtered(request):
-    """
-    Return list of people photo URLs based on filters.
-    """
-    trip_id = request.GET.get("trip_id")
-    location = request.GET.get("location")
-    start_date = request.GET.get("start_date")
-    end_date = request.GET.get("end_date")
-
+def _filtered_people_photos(trip_id, location, start_date, end_date):
+    """Query people photo paths for the report filters."""
     query = """
         SELECT DISTINCT photo FROM api_personphoto pp
         JOIN api_people p ON pp.person_id = p.person_id
@@ -880,29 +1502,18 @@ def get_people_photos_filtered(request):
         query += " AND p.trip_id = %s"
         params.append(trip_id)
     if location:
-        query += " AND p.met_location = %s"
-        params.append(location)
+        query += f" AND p.met_location_id = {LOCATION_ID}"
+        params.append(canonical_key(location))
     if start_date and end_date:
         query += " AND p.met_date BETWEEN %s AND %s"
         params.extend([start_date, end_date])
 
     with connection.cursor() as cursor:
         cursor.execute(query, params)
-        photos = [row[0] for row in cursor.fetchall() if row[0]]
-
-    return Response({"photos": photos})
-
-
-@api_view(['GET'])
-def get_memory_photos_filtered(request):
-    """
-    Return list of memory photo URLs based on filters.
-    """
-    trip_id = request.GET.get("trip_id")
-    location = request.GET.get("location")
-    start_date = request.GET.get("start_date")
-    end_date = request.GET.get("end_date")
+        return [row[0] for row in cursor.fetchall() if row[0]]
 
+def _filtered_memory_photos(trip_id, location, start_date, end_date):
+    """Query memory photo paths for the report filters."""
     query = """
         SELECT DISTINCT memory_photo FROM api_memories
         WHERE memory_photo IS NOT NULL AND TRIM(memory_photo) != ''
@@ -913,14 +1524,342 @@ def get_memory_photos_filtered(request):
         query += " AND trip_id = %s"
         params.append(trip_id)
     if location:
-        query += " AND location = %s"
-        params.append(location)
+        query += f" AND location_id = {LOCATION_ID}"
+        params.append(canonical_key(location))
     if start_date and end_date:
         query += " AND date BETWEEN %s AND %s"
         params.extend([start_date, end_date])
 
     with connection.cursor() as cursor:
         cursor.execute(query, params)
-        photos = [row[0] for row in cursor.fetchall() if row[0]]
+        return [row[0] for row in cursor.fetchall() if row[0]]
+
+def _photos_with_renditions(query_photos, trip_id, location, start_date, end_date):
+    photos = query_photos(trip_id, location, start_date, end_date)
+    return {"photos": photos, "renditions": rendition_map(photos)}
+
+@conditional_response
+@require_GET
+@cached_response("people-photos", response_class=_report_response)
+async def get_people_photos_filtered(request):
+    """
+    Return list of people photo URLs based on filters.
+    """
+    trip_id, location, _, start_date, end_date = _report_filters(request)
+    data, = await gather_queries(
+        partial(_photos_with_renditions, _filtered_people_photos, trip_id, location, start_date, end_date))
+    return _report_response(data)
+
+@conditional_response
+@require_GET
+@cached_response("memory-photos", response_class=_report_response)
+async def get_memory_photos_filtered(request):
+    """
+    Return list of memory photo URLs based on filters.
+    """
+    trip_id, location, _, start_date, end_date = _report_filters(request)
+    data, = await gather_queries(
+        partial(_photos_with_renditions, _filtered_memory_photos, trip_id, location, start_date, end_date))
+    return _report_response(data)
+
+def _fetch_rows(query, params):
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+@conditional_response
+@require_GET
+@cached_response("full", extra_params=("include_photos",), response_class=_report_response)
+async def get_full_report(request):
+    """
+    Returns the expense summary, both pie breakdowns and the secondary counts in one response.
+    Each table is scanned once with a grouped query, next to the distinct location count shared
+    with the secondary summary; the scans run concurrently and the result is folded in Python. Pass include_photos=true to also get the people and memory photo lists.
+    """
+    trip_id, location, category, start_date, end_date = _report_filters(request)
+    include_photos = request.GET.get("include_photos") in ("1", "true", "True")
+
+    # --- Budget (via the rollup): one scan grouped by lookup ids, location/category filters applied while folding ---
+    budget_query = """
+        SELECT r.location_id, l.name, c.name,
+               SUM(r.total), SUM(r.count), MAX(r.max_expense), MIN(r.min_expense), MAX(r.date)
+        FROM api_budgetrollup r
+        JOIN api_location l ON l.location_id = r.location_id
+        JOIN api_category c ON c.category_id = r.category_id
+        WHERE 1=1
+    """
+    budget_params = []
+
+    if trip_id:
+        budget_query += " AND r.trip_id = %s"
+        budget_params.append(trip_id)
+    if start_date and end_date:
+        budget_query += " AND r.date BETWEEN %s AND %s"
+        budget_params.extend([start_date, end_date])
+
+    budget_query += " GROUP BY r.location_id, r.category_id"
+
+    # --- People: one grouped scan by met_location_id ---
+    people_query = """
+        SELECT p.met_location_id, l.name, COUNT(*)
+        FROM api_people p JOIN api_location l ON l.location_id = p.met_location_id
+        WHERE 1=1
+    """
+    people_params = []
+
+    if trip_id:
+        people_query += " AND p.trip_id = %s"
+        people_params.append(trip_id)
+    if start_date and end_date:
+        people_query += " AND p.met_date BETWEEN %s AND %s"
+        people_params.extend([start_date, end_date])
+
+    people_query += " GROUP BY p.met_location_id"
+
+    # --- Memories: one grouped scan by location_id ---
+    memory_query = """
+        SELECT m.location_id, l.name, COUNT(*)
+        FROM api_memories m JOIN api_location l ON l.location_id = m.location_id
+        WHERE 1=1
+    """
+    memory_params = []
+
+    if trip_id:
+        memory_query += " AND m.trip_id = %s"
+        memory_params.append(trip_id)
+    if start_date and end_date:
+        memory_query += " AND m.date BETWEEN %s AND %s"
+        memory_params.extend([start_date, end_date])
+
+    memory_query += " GROUP BY m.location_id"
+
+    queries = [
+        partial(_fetch_rows, budget_query, budget_params),
+        partial(_fetch_rows, people_query, people_params),
+        partial(_fetch_rows, memory_query, memory_params),
+        partial(_location_count, trip_id, category, start_date, end_date),
+    ]
+    if include_photos:
+        queries += [
+            partial(_filtered_people_photos, trip_id, location, start_date, end_date),
+            partial(_filtered_memory_photos, trip_id, location, start_date, end_date),
+        ]
+    budget_rows, people_rows, memory_rows, location_count, *photos = await gather_queries(*queries)
+
+    total = 0
+    count = 0
+    max_expense = None
+    min_expense = None
+    last_date = None
+    category_totals = {}
+    location_totals = {}
+    # Filters match lookup names the way the lookup tables do
+    location_key = canonical_key(location) if location else None
+    category_key = canonical_key(category) if category else None
+
+    for location_id, row_location, row_category, row_sum, row_count, row_max, row_min, row_last in budget_rows:
+        if category and canonical_key(row_category) != category_key:
+            continue
+        if location and canonical_key(row_location) != location_key:
+            continue
+        total += row_sum or 0
+        count += row_count
+        max_expense = row_max if max_expense is None else max(max_expense, row_max)
+        min_expense = row_min if min_expense is None else min(min_expense, row_min)
+        if row_last and (last_date is None or row_last > last_date):
+            last_date = row_last
+        category_totals[row_category] = category_totals.get(row_category, 0) + row_sum
+        location_totals[row_location] = location_totals.get(row_location, 0) + row_sum
+
+    people_count = 0
+    for location_id, row_location, row_count in people_rows:
+        if not location or canonical_key(row_location) == location_key:
+            people_count += row_count
+
+    memory_count = 0
+    for location_id, row_location, row_count in memory_rows:
+        if not location or canonical_key(row_location) == location_key:
+            memory_count += row_count
+
+    data = {
+        "summary": {
+            "total_expense": total,
+            "average_expense": total / count if count else 0,
+            "number_of_expenses": count,
+            "max_expense": max_expense or 0,
+            "min_expense": min_expense or 0,
+            "last_date": last_date
+        },
+        "category_pie": [
+            {"category": key, "total": value}
+            for key, value in sorted(category_totals.items(), key=lambda item: item[1], reverse=True)
+        ],
+        "location_pie": [
+            {"location": key, "total": value}
+            for key, value in sorted(location_totals.items(), key=lambda item: item[1], reverse=True)
+        ],
+        "secondary_summary": {
+            "people_met": people_count,
+            "locations_visited": location_count,
+            "memories": memory_count
+        }
+    }
+
+    if include_photos:
+        data["people_photos"], data["memory_photos"] = photos
+        data["photo_renditions"], = await gather_queries(
+            partial(rendition_map, data["people_photos"] + data["memory_photos"]))
+
+    return _report_response(data)
+
+@api_view(['GET'])
+def get_cache_stats(request):
+    """
+    Return hit/miss counters of the report response cache.
+    """
+    return Response(cache_stats())
+
+@api_view(['GET'])
+def get_engine_stats(request):
+    """
+    Return rebuild time, memory footprint and query latency of the in-memory budget engine.
+    """
+    return Response(budget_engine.stats())
+
+# Export sources: model, serializer fields and the columns the report filters apply to
+EXPORT_SOURCES = {
+    "budget": (Budget, BudgetSerializer.Meta.fields, {"location": "location", "category": "category", "date": "date"}),
+    "people": (People, PeopleSerializer.Meta.fields, {"location": "met_location", "date": "met_date"}),
+    "memories": (Memories, MemoriesSerializer.Meta.fields, {"location": "location", "date": "date"}),
+}
+
+
+class _Echo:
+    """File-like object whose write() returns the value, so csv.writer can feed a stream."""
+
+    def write(self, value):
+        return value
+
+
+def _stream_export(queryset, fields, file_format, chunk_size):
+    """Yield CSV or NDJSON lines for a queryset, reading it chunk by chunk."""
+    # Location and category columns are exported by name
+    columns = [f"{field}__name" if field in LOOKUP_FIELDS else field for field in fields]
+    rows = queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+    if file_format == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(fields, row)), default=str) + "\n"
+
+
+async def _stream_export_async(lines, batch_size):
+    """
+    Async iterator over the lines of _stream_export for ASGI servers, which would read a sync
+    iterator to the end before sending anything. Batches of lines are read in the thread that
+    holds the database connection, so the query cursor stays in one thread.
+    """
+    read_batch = sync_to_async(lambda: "".join(islice(lines, batch_size)), thread_sensitive=True)
+    try:
+        while batch := await read_batch():
+            yield batch
+    finally:
+        await sync_to_async(lines.close, thread_sensitive=True)()
+
+
+def _export_response(request, kind, trip_id=None):
+    """Build the streaming export response shared by the per-trip and all-trips endpoints."""
+    if kind not in EXPORT_SOURCES:
+        return Response({"error": "Export must be budget, people or memories."}, status=status.HTTP_404_NOT_FOUND)
+
+    # "format" is reserved by DRF for renderer selection
+    file_format = request.GET.get("export_format", "csv").lower()
+    if file_format not in ("csv", "ndjson"):
+        return Response({"error": "Format must be csv or ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        chunk_size = max(1, int(request.GET.get("chunk_size", 2000)))
+    except ValueError:
+        return Response({"error": "Chunk size must be a valid number."}, status=status.HTTP_400_BAD_REQUEST)
+
+    model, fields, columns = EXPORT_SOURCES[kind]
+    _, location, category, start_date, end_date = _report_filters(request)
+    if trip_id is None:
+        trip_id = request.GET.get("trip_id") or None
+
+    queryset = model.objects.order_by("pk")
+    if trip_id:
+        queryset = queryset.filter(trip_id=trip_id)
+    if location:
+        queryset = queryset.filter(**{f"{columns['location']}__key": canonical_key(location)})
+    if category and "category" in columns:
+        queryset = queryset.filter(**{f"{columns['category']}__key": canonical_key(category)})
+    if start_date or end_date:
+        start_date, end_date = _parse_filter_date(start_date or ""), _parse_filter_date(end_date or "")
+        if start_date is None or end_date is None:
+            return Response({"error": "Invalid date format."}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = queryset.filter(**{f"{columns['date']}__range": (start_date, end_date)})
+
+    content_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+    lines = _stream_export(queryset, fields, file_format, chunk_size)
+    if isinstance(request._request, ASGIRequest):
+        lines = _stream_export_async(lines, chunk_size)
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    name = f"trip_{trip_id}_{kind}" if trip_id else kind
+    response["Content-Disposition"] = f'attachment; filename="{name}.{file_format}"'
+    return response
+
+
+@api_view(['GET'])
+def export_trip_data(request, trip_id, kind):
+    """
+    Stream a trip's budget, people or memories as CSV or NDJSON (export_format=csv|ndjson).
+    Accepts the report filters location, category, start_date and end_date.
+    """
+    if not Triprel.objects.filter(trip_id=trip_id).exists():
+        return Response({"error": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    return _export_response(request, kind, trip_id)
+
+
+@api_view(['GET'])
+def export_all_data(request, kind):
+    """
+    Stream budget, people or memories rows across all trips as CSV or NDJSON.
+    Accepts the same filters as the report/* views.
+    """
+    return _export_response(request, kind)
+
+@api_view(['GET'])
+def search_entries(request):
+    """
+    Full-text search over budget labels/locations/categories, memory captions/locations and people.
+    Takes q plus optional trip_id, start_date/end_date, kind (budget,people,memories), page and page_size.
+    Returns ranked hits with highlighted snippets.
+    """
+    text = request.GET.get("q", "").strip()
+    if not text:
+        return Response({"error": "Search text cannot be empty."}, status=status.HTTP_400_BAD_REQUEST)
+
+    trip_id = request.GET.get("trip_id") or None
+    start_date = request.GET.get("start_date")
+    end_date = request.GET.get("end_date")
+    kinds = [kind for kind in request.GET.get("kind", "").split(",") if kind]
+
+    if any(kind not in SEARCH_SOURCES for kind in kinds):
+        return Response({"error": "Kind must be budget, people or memories."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        trip_id = int(trip_id) if trip_id else None
+        page = max(1, int(request.GET.get("page", 1)))
+        page_size = min(max(1, int(request.GET.get("page_size", 20))), 100)
+    except ValueError:
+        return Response({"error": "trip_id, page and page_size must be valid numbers."}, status=status.HTTP_400_BAD_REQUEST)
+
+    hits, total = search_index(text, trip_id, start_date, end_date, kinds,
+                               limit=page_size, offset=(page - 1) * page_size)
 
-    return Response({"photos": photos})
+    return Response({"query": text, "total": total, "page": page, "page_size": page_size, "results": hits})
@@ -0,0 +1,203 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from django.db import connection, transaction
+from .cache import external_epoch
+from .models import Budget, People, Memories
+
+# In-memory typeahead vocabulary for location and category names.
+# Each field keeps usage counts per (trip, value) plus sorted (casefolded value, value) lists,
+# globally and per trip, so a prefix lookup is two binary searches over the sorted list.
+# The vocabulary is built lazily on the first lookup. Instance saves and deletes update it
+# through model signals once their transaction commits; bulk writes call invalidate_vocabulary()
+# and the next lookup rebuilds it.
+
+# field: {model: foreign key to the Location or Category lookup table}
+FIELDS = {
+    "locations": {Budget: "location", People: "met_location", Memories: "location"},
+    "categories": {Budget: "category"},
+}
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def _clean(value):
+    return (value or "").strip(" ")  # Same characters as SQL TRIM()
+
+
+class _FieldIndex:
+    """Usage counts and sorted keys of one field."""
+
+    def __init__(self):
+        self.counts = Counter()  # (trip_id, value) -> uses
+        self.totals = Counter()  # value -> uses across trips
+        self.keys = []  # sorted (casefolded, value) across trips
+        self.trip_keys = {}  # trip_id -> sorted (casefolded, value)
+
+    def add(self, trip_id, value, uses=1):
+        if self.counts[(trip_id, value)] == 0:
+            insort(self.trip_keys.setdefault(trip_id, []), (value.casefold(), value))
+        if self.totals[value] == 0:
+            insort(self.keys, (value.casefold(), value))
+        self.counts[(trip_id, value)] += uses
+        self.totals[value] += uses
+
+    def remove(self, trip_id, value):
+        if self.counts[(trip_id, value)] <= 0:
+            return
+        self.counts[(trip_id, value)] -= 1
+        self.totals[value] -= 1
+        key = (value.casefold(), value)
+        if self.counts[(trip_id, value)] == 0:
+            del self.counts[(trip_id, value)]
+            keys = self.trip_keys[trip_id]
+            del keys[bisect_left(keys, key)]
+            if not keys:
+                del self.trip_keys[trip_id]
+        if self.totals[value] == 0:
+            del self.totals[value]
+            del self.keys[bisect_left(self.keys, key)]
+
+    def lookup(self, prefix, trip_id=None, limit=DEFAULT_LIMIT):
+        """Return up to limit (value, uses) starting with prefix, most used first."""
+        keys = self.keys if trip_id is None else self.trip_keys.get(trip_id, [])
+        prefix = prefix.casefold()
+        start = bisect_left(keys, (prefix,))
+        end = bisect_left(keys, (prefix + "\U0010ffff",))
+        if trip_id is None:
+            uses = (lambda key: self.totals[key[1]])
+        else:
+            uses = (lambda key: self.counts[(trip_id, key[1])])
+        best = heapq.nsmallest(limit, keys[start:end], key=lambda key: (-uses(key), key))
+        return [(value, uses((folded, value))) for folded, value in best]
+
+
+class Vocabulary:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fields = None
+        self._generation = 0  # Bumped by every change, so a build that raced a write is not kept
+        self._epoch = 0  # external_epoch() the vocabulary was built at
+
+    def _load(self):
+        fields = {name: _FieldIndex() for name in FIELDS}
+        with connection.cursor() as cursor:
+            for name, sources in FIELDS.items():
+                for model, field_name in sources.items():
+                    field = model._meta.get_field(field_name)
+                    lookup = field.related_model._meta
+                    cursor.execute(f"""
+                        SELECT s.trip_id, TRIM(l.name), COUNT(*) FROM {model._meta.db_table} s
+                        JOIN {lookup.db_table} l ON l.{lookup.pk.column} = s.{field.column}
+                        GROUP BY s.trip_id, TRIM(l.name)
+                    """)
+                    for trip_id, value, uses in cursor.fetchall():
+                        if value:
+                            fields[name].add(trip_id, value, uses)
+        return fields
+
+    def _current(self):
+        epoch = external_epoch()
+        with self._lock:
+            if self._fields is not None and self._epoch == epoch:
+                return self._fields
+            self._fields = None  # Another process wrote since the build
+            generation = self._generation
+        fields = self._load()
+        with self._lock:
+            if self._generation == generation:
+                self._fields = fields
+                self._epoch = epoch
+        return fields
+
+    def lookup(self, field, prefix, trip_id=None, limit=DEFAULT_LIMIT):
+        fields = self._current()
+        with self._lock:
+            return fields[field].lookup(prefix, trip_id, limit)
+
+    def is_built(self):
+        with self._lock:
+            return self._fields is not None
+
+    def apply(self, removed=(), added=()):
+        """Apply (field, trip_id, value) changes; a no-op until the vocabulary is built."""
+        with self._lock:
+            self._generation += 1
+            if self._fields is None:
+                return
+            for field, trip_id, value in removed:
+                self._fields[field].remove(trip_id, value)
+            for field, trip_id, value in added:
+                self._fields[field].add(trip_id, value)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._fields = None
+
+
+vocabulary = Vocabulary()
+
+
+def invalidate_vocabulary():
+    """Drop the vocabulary after bulk writes that bypass model signals (bulk_create, queryset.update)."""
+    transaction.on_commit(vocabulary.invalidate)
+
+
+def _entries(model, trip_id, values):
+    """(field, trip_id, value) for the non-blank vocabulary names of one row."""
+    entries = []
+    for field, sources in FIELDS.items():
+        value = _clean(values.get(sources[model])) if model in sources else ""
+        if value:
+            entries.append((field, trip_id, value))
+    return entries
+
+
+def _columns(model):
+    return [sources[model] for sources in FIELDS.values() if model in sources]
+
+
+def _names(model, instance):
+    """{field name: lookup name} of one instance."""
+    return {column: getattr(getattr(instance, column), "name", None) for column in _columns(model)}
+
+
+def remember_old_values(sender, instance, **kwargs):
+    """pre_save: read the stored names an update is about to replace."""
+    if instance._state.adding or not vocabulary.is_built():
+        return
+    columns = _columns(sender)
+    old = sender.objects.filter(pk=instance.pk).values_list("trip_id", *(f"{column}__name" for column in columns)).first()
+    instance._vocabulary_old = _entries(sender, old[0], dict(zip(columns, old[1:]))) if old else []
+
+
+def record_save(sender, instance, created, **kwargs):
+    """post_save: swap the old values for the new ones once the write commits."""
+    removed = getattr(instance, "_vocabulary_old", [])
+    instance._vocabulary_old = []
+    added = _entries(sender, instance.trip_id, _names(sender, instance))
+    if removed != added:
+        transaction.on_commit(lambda: vocabulary.apply(removed, added))
+
+
+def record_delete(instance):
+    """
+    Drop the values of a deleted row once the delete commits.
+    Called by the delete views rather than connected to post_delete, which would stop Django
+    from deleting querysets of the model with a single DELETE.
+    """
+    model = type(instance)
+    removed = _entries(model, instance.trip_id, _names(model, instance))
+    if removed:
+        transaction.on_commit(lambda: vocabulary.apply(removed=removed))
+
+
+def suggest(field, prefix, trip_id=None, limit=DEFAULT_LIMIT):
+    """Return [{singular field name: value, "count": uses}] for values starting with prefix."""
+    name = field[:-3] + "y" if field.endswith("ies") else field[:-1]
+    return [{name: value, "count": uses}
+            for value, uses in vocabulary.lookup(field, prefix.strip(), trip_id, limit)]
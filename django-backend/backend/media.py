@@ -0,0 +1,175 @@
+"""
+Storage naming and HTTP serving of uploaded media.
+
+Uploads are stored under a name carrying a hash of their content (images/beach.3f2a9c0d1b7e4a56.jpg),
+so a name never points at different bytes and hashed files can be cached as immutable.
+serve_media answers /media/ in any DEBUG mode with validators (ETag, Last-Modified), single byte
+ranges and a file response the WSGI server can hand to sendfile.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+DEFAULTS = {
+    'MAX_AGE': 3600,  # Seconds for media without a content hash in the name
+    'IMMUTABLE_MAX_AGE': 31536000,  # One year for content-hashed media
+}
+
+HASH_LENGTH = 16
+# stem.<hash>.ext, optionally with the _xxxxxxx suffix storage adds to avoid a name clash
+HASHED_NAME = re.compile(r"\.[0-9a-f]{%d}(?:_[A-Za-z0-9]{7})?\.[A-Za-z0-9]+$" % HASH_LENGTH)
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'MEDIA_SERVING', {})}
+
+
+def media_max_age():
+    """Cache lifetime in seconds of media without a content hash in the name."""
+    return _config()['MAX_AGE']
+
+
+def is_hashed(path, url=None):
+    """True for names that carry a content hash; also usable as WhiteNoise's immutable_file_test."""
+    return bool(HASHED_NAME.search(url or path))
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage that names each upload after a hash of its content."""
+
+    def save(self, name, content, max_length=None):
+        if name is not None and content is not None:
+            if not hasattr(content, "chunks"):
+                content = File(content, name)
+            name = self.hashed_name(name, content, max_length)
+        return super().save(name, content, max_length)
+
+    def hashed_name(self, name, content, max_length=None):
+        folder, filename = os.path.split(name)
+        if HASHED_NAME.search(filename):
+            return name
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        stem, ext = os.path.splitext(filename)
+        # Keep room for the hash and a clash suffix within the field's max_length
+        limit = (max_length or 100) - len(folder) - len(ext) - HASH_LENGTH - 10
+        stem = stem[:max(limit, 1)]
+        return os.path.join(folder, f"{stem}.{digest.hexdigest()[:HASH_LENGTH]}{ext}")
+
+
+class _FileRange:
+    """Read-only view of bytes [start, start + length) of an open file; keeps fileno() for sendfile."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _byte_range(header, size):
+    """
+    Parse a single-range Range header into (start, end) inclusive.
+    Returns None to serve the whole file (no header, multiple ranges) and raises ValueError if unsatisfiable.
+    """
+    match = RANGE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def serve_media(request, path):
+    """Serve one file from MEDIA_ROOT with conditional, range and cache headers."""
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404("Media file not found.")
+    if not os.path.isfile(full_path) or os.path.basename(full_path).startswith("."):
+        raise Http404("Media file not found.")
+
+    config = _config()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": (f"public, max-age={config['IMMUTABLE_MAX_AGE']}, immutable" if is_hashed(path)
+                          else f"public, max-age={config['MAX_AGE']}"),
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for name, value in headers.items():
+            response.headers[name] = value
+        return response
+
+    # If-Range: only honour Range when the client's copy is still current
+    byte_range = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if byte_range and if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        byte_range = None
+
+    size = stat.st_size
+    try:
+        selected = _byte_range(byte_range, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response.headers["Content-Range"] = f"bytes */{size}"
+        return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    file = open(full_path, "rb")
+    if selected is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = selected
+        response = FileResponse(_FileRange(file, start, end - start + 1), content_type=content_type, status=206)
+        response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        size = end - start + 1
+    response.headers["Content-Length"] = str(size)
+    for name, value in headers.items():
+        response.headers[name] = value
+    return response
@@ -0,0 +1,95 @@
+"""
+Production serving for TravelTrack on Linux.
+
+Runs the WSGI application under gunicorn: pre-forked worker processes with a thread pool each,
+replacement of hung workers, and graceful reload on SIGHUP (workers finish their requests before
+being replaced). There is no per-request time limit: under the gthread worker a slow request on a
+live worker runs to completion.
+Media files are answered by WhiteNoise in front of Django, so they never reach the URL resolver;
+static files are served by the WhiteNoise middleware.
+"""
+
+import multiprocessing
+import os
+from posixpath import normpath
+
+from django.conf import settings
+from whitenoise import WhiteNoise
+from whitenoise.string_utils import decode_path_info, ensure_leading_trailing_slash
+
+from backend.media import is_hashed, media_max_age
+
+DEFAULTS = {
+    'bind': '127.0.0.1:8000',
+    'workers': min(multiprocessing.cpu_count() * 2 + 1, 8),
+    'threads': 4,
+    'timeout': 60,  # Seconds without a heartbeat before a worker process is killed; slow requests are not cut off
+    'graceful_timeout': 30,  # Seconds workers get to finish requests on reload or shutdown
+    'keepalive': 5,
+    'max_requests': 1000,  # Recycle workers periodically
+    'max_requests_jitter': 100,
+}
+
+
+class MediaFiles(WhiteNoise):
+    """
+    WhiteNoise over MEDIA_ROOT, indexed at startup like static files rather than with the
+    development-only autorefresh. Uploads made later, by any worker process, are indexed on
+    their first request; files deleted since are dropped from the index and left to Django,
+    whose serve_media answers 404.
+    """
+
+    def __init__(self, application, root, prefix, **kwargs):
+        super().__init__(application, root=root, prefix=prefix, **kwargs)
+        self.media_root = os.path.abspath(root)
+        self.media_prefix = ensure_leading_trailing_slash(prefix)
+
+    def _media_path(self, url):
+        """Filesystem path of a canonical media URL, or None for other URLs."""
+        if not url.startswith(self.media_prefix) or normpath(url) != url or "\\" in url:
+            return None
+        path = os.path.join(self.media_root, *url[len(self.media_prefix):].split("/"))
+        return path if path.startswith(self.media_root + os.sep) else None
+
+    def __call__(self, environ, start_response):
+        url = decode_path_info(environ.get("PATH_INFO", ""))
+        path = self._media_path(url)
+        static_file = self.files.get(url) if path else None
+        # One stat per request, instead of the header and file lookups autorefresh repeats
+        if path and os.path.isfile(path):
+            if static_file is None:
+                self.add_file_to_dictionary(url, path)
+                static_file = self.files.get(url)
+        elif static_file is not None:
+            self.files.pop(url, None)
+            static_file = None
+        if static_file is None:
+            return self.application(environ, start_response)
+        return self.serve(static_file, environ, start_response)
+
+
+def build_application():
+    """The Django WSGI application with media files answered before Django."""
+    from backend.wsgi import application
+
+    return MediaFiles(application, settings.MEDIA_ROOT, settings.MEDIA_URL, allow_all_origins=False,
+                      max_age=media_max_age(), immutable_file_test=is_hashed)
+
+
+def serve(options=None):
+    """Run the production server in the foreground; options override DEFAULTS."""
+    from gunicorn.app.base import BaseApplication
+
+    config = {**DEFAULTS, **(options or {})}
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            for name, value in config.items():
+                self.cfg.set(name, value)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('proc_name', 'traveltrack')
+
+        def load(self):
+            return build_application()
+
+    ProductionServer().run()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    "whitenoise.middleware.WhiteNoiseMiddleware",  # Static files are answered before the rest of the stack
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,7 +55,6 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    "whitenoise.middleware.WhiteNoiseMiddleware",
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -84,6 +85,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': None,  # Keep connections open between requests
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -137,7 +140,103 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Response cache for report and lookup endpoints (see api/cache.py)
+# BACKEND: 'local' keeps a per-process LRU, 'django' stores entries in CACHES[ALIAS]
+REPORT_CACHE = {
+    'BACKEND': 'local',
+    'ALIAS': 'default',
+    'MAX_ENTRIES': 256,
+    'TIMEOUT': None,
+    # Set by django-server.py --mode production, where each worker process has its own local cache
+    'WATCH_EXTERNAL_WRITES': os.environ.get('TRAVELTRACK_SERVER_MODE') == 'production',
+}
+
+# Thread pool running the independent queries of the async report views (see api/concurrency.py)
+REPORT_CONCURRENCY = {
+    'ENABLED': True,
+    'MAX_WORKERS': 4,
+}
+
+# In-memory NumPy columns answering the expense summary and pie reports (see api/columnar.py);
+# used only when NumPy is installed, otherwise the reports query SQLite
+BUDGET_ENGINE = {
+    'ENABLED': True,
+    'COMPACT_RATIO': 0.25,
+}
+
+# Histogram and outlier defaults of report/distribution/ (see api/distribution.py)
+EXPENSE_DISTRIBUTION = {
+    'BINS': 20,
+    'MAX_BINS': 200,
+    'OUTLIER_Z': 3.5,
+    'MIN_CATEGORY_SIZE': 4,
+    'MAX_OUTLIERS': 50,
+}
+
+# Chunked set-based trip deletion and its status reporting (see api/trip_deletion.py)
+TRIP_DELETION = {
+    'CHUNK_SIZE': 5000,
+}
+
+# Background jobs persisted in api_job, run by a worker thread per server process (see api/jobs.py)
+JOB_QUEUE = {
+    'WORKER': True,
+    'POLL_SECONDS': 2,
+    'MAX_ATTEMPTS': 3,
+    'BACKOFF_SECONDS': 5,
+    'MAX_BACKOFF_SECONDS': 300,
+    'LEASE_SECONDS': 60,
+    'KEEP_DAYS': 7,
+}
+
+# Opt-in keyset pagination for trip list endpoints (see api/pagination.py)
+KEYSET_PAGINATION = {
+    'DEFAULT_PAGE_SIZE': 50,
+    'MAX_PAGE_SIZE': 500,
+}
+
+# PRAGMAs applied to every SQLite connection (see api/sqlite_profile.py); None keeps SQLite's default
+SQLITE_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+# Validation and re-encoding of uploaded photos (see api/ingest.py)
+IMAGE_INGEST = {
+    'MAX_UPLOAD_BYTES': 25 * 1024 * 1024,
+    'MAX_PIXELS': 50_000_000,
+    'MAX_EDGE': 4096,
+    'FORMAT': 'WEBP',
+    'EXTENSION': '.webp',
+    'QUALITY': 82,
+    'KEEP_ORIGINAL': False,
+    'WORKERS': 2,
+}
+
+# Thumbnail/medium renditions of uploaded photos (see api/renditions.py)
+IMAGE_RENDITIONS = {
+    'SIZES': {'thumb': 256, 'medium': 1024},
+    'QUALITY': 85,
+    'WORKERS': 2,
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are named after a hash of their content (see backend/media.py)
+STORAGES = {
+    'default': {'BACKEND': 'backend.media.HashedFileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Cache lifetimes of served media; content-hashed names are also marked immutable
+MEDIA_SERVING = {
+    'MAX_AGE': 3600,
+    'IMMUTABLE_MAX_AGE': 31536000,
+}
+
 STATICFILES_DIRS = [Path(__file__).resolve().parent.parent.parent / "vue-frontend" / "dist"]
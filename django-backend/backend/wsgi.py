@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Background jobs run in the serving process; queued and interrupted jobs resume here after a restart
+from api.jobs import start_worker  # noqa: E402
+
+start_worker()
@@ -1,12 +1,41 @@
+import argparse
+import multiprocessing
 import os
 import sys
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Start the TravelTrack backend.")
+    parser.add_argument('--mode', choices=['dev', 'production'], default=os.environ.get('TRAVELTRACK_SERVER_MODE', 'dev'),
+                        help="dev: Django's runserver (default). production: pre-forked gunicorn workers (Linux).")
+    parser.add_argument('--bind', default='127.0.0.1:8000', help="Address to listen on.")
+    parser.add_argument('--workers', type=int, help="Worker processes (production mode).")
+    parser.add_argument('--threads', type=int, help="Threads per worker (production mode).")
+    parser.add_argument('--timeout', type=int, help="Seconds before a stuck worker is restarted (production mode).")
+    parser.add_argument('--graceful-timeout', type=int, help="Seconds workers get to finish on reload/shutdown (production mode).")
+    return parser.parse_args()
+
 def main():
+    multiprocessing.freeze_support()  # Image decoding workers are spawned from the packaged executable too
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')  # <-- Change if your settings module name is different
+    args = parse_args()
+
+    if args.mode == 'production':
+        if os.name != 'posix':
+            sys.exit("Production mode needs a pre-forking server and is only available on Linux; use --mode dev.")
+        # Read by settings: worker processes have their own caches and must notice each other's writes
+        os.environ['TRAVELTRACK_SERVER_MODE'] = 'production'
+        from backend.production import serve
+
+        options = {'bind': args.bind, 'workers': args.workers, 'threads': args.threads,
+                   'timeout': args.timeout, 'graceful_timeout': args.graceful_timeout}
+        # Send SIGHUP to the master process for a graceful reload
+        serve({name: value for name, value in options.items() if value is not None})
+        return
+
     from django.core.management import execute_from_command_line
 
     # Run server without reloader
-    execute_from_command_line(['manage.py', 'runserver', '--noreload', '127.0.0.1:8000'])
+    execute_from_command_line(['manage.py', 'runserver', '--noreload', args.bind])
 
 if __name__ == '__main__':
     main()